@@ -1,23 +1,60 @@
 # standard libraries
 import os
+import sys
+import types
+import importlib
 # third party libraries
 pass
 # first party libraries
-from . import (routing, utilities, exceptions, application, controllers,
-               static, authentication)
+pass
 
-Controller = controllers.Controller
-app = application.app
-serve = application.serve
-logger = application.logger
-Application = application.Application
-application = application.application
+# submodules, and the names taken from them, are imported on first access
+# so that using Controller or routing doesn't load waitress, webob, etc.
+_SUBMODULES = ('routing', 'utilities', 'exceptions', 'application',
+               'controllers', 'static', 'authentication', 'caching')
+_ATTRIBUTES = {'Controller': ('controllers', 'Controller'),
+               'app': ('application', 'app'),
+               'serve': ('application', 'serve'),
+               'logger': ('application', 'logger'),
+               'Application': ('application', 'Application')}
 
 _where = os.path.dirname(os.path.abspath(__file__))
 
-with open(os.path.join(_where, '..', 'VERSION'), 'rb') as f:
-    __version__ = f.read()
-
 __all__ = ('__version__', 'routing', 'utilities', 'exceptions', 'app',
            'application', 'Application', 'authentication', 'Controller',
-           'static', 'logger')
+           'static', 'caching', 'logger')
+
+
+def __getattr__(name):
+    if name == '__version__':
+        with open(os.path.join(_where, '..', 'VERSION'), 'rb') as f:
+            value = f.read()
+    elif name in _SUBMODULES:
+        value = importlib.import_module('.' + name, __name__)
+    elif name in _ATTRIBUTES:
+        module_name, attribute = _ATTRIBUTES[name]
+        module = importlib.import_module('.' + module_name, __name__)
+        value = getattr(module, attribute)
+    else:
+        error_message = 'module {!r} has no attribute {!r}'
+        raise AttributeError(error_message.format(__name__, name))
+    # (through _Package, which keeps the application instance)
+    setattr(sys.modules[__name__], name, value)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _Package(types.ModuleType):
+
+    def __setattr__(self, name, value):
+        # classy.application is the application instance, which shadows its
+        # module; importing the module binds it here, so keep the instance
+        if name == 'application' and isinstance(value, types.ModuleType):
+            value = value.application
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
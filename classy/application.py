@@ -6,23 +6,40 @@ import logging
 import inspect
 # third party libraries
 import webob
-import waitress
 # first party libraries
-from . import (routing, utilities, exceptions, static, controllers)
+from . import (routing, utilities, exceptions, controllers, log_queue,
+               metrics)
 
 
 logger = logging.getLogger('classy')
 logger.setLevel(logging.INFO)
 
+# the headers of an untouched webob.Response, less its Content-Length
+_DEFAULT_HEADERS = [(name, value) for name, value in 
+                    webob.Response().headerlist if name != 'Content-Length']
+# what handlers may return to be answered without building a response
+_DIRECT_TYPES = frozenset((str, bytes, type(None)))
+
 
 class Application:
 
     configuration = {'logger': logger}
     routes = {}
+    route_trie = None
+    match_cache = None
+    metrics = None
+    profiler = None
+    asgi_executor = None
+    dispatch_plans = None
+    error_responses = None
     
     def configure(self):
+        dispatch_plans = {}
         def _configure(Controller):
             Controller.__configure__(self.configuration)
+            for method in routing._HTTP_METHODS:
+                dispatch_plans[(Controller, method)] = \
+                    controllers.dispatch_plan(Controller, method)
             for _, potential_controller in inspect.getmembers(Controller):
                 if not isinstance(potential_controller, type):
                     continue
@@ -31,48 +48,245 @@ class Application:
                     _configure(child_controller)
         for Controller in self.routes.values():
             _configure(Controller)
+        self.dispatch_plans = dispatch_plans
+        self.route_trie = routing.compile_routes(self.routes)
+        match_cache_size = self.configuration.get('match_cache_size', None)
+        if match_cache_size:
+            self.match_cache = routing.MatchCache(match_cache_size)
+        log_queue_size = self.configuration.get('log_queue_size', None)
+        if log_queue_size and 'log_queue' not in self.configuration:
+            log_queue_policy = self.configuration.get('log_queue_policy',
+                                                      'drop')
+            self.configuration['log_queue'] = log_queue.LogQueue(
+                self.configuration['logger'], log_queue_size,
+                log_queue_policy)
+        if self.configuration.get('metrics', None) is True:
+            self.configuration['metrics'] = metrics.Metrics()
+        self.metrics = self.configuration.get('metrics', None)
+        self.profiler = self.configuration.get('profiler', None)
+        if self.configuration.get('prerendered_errors', False):
+            self.error_responses = exceptions.ErrorResponses()
         
     def __call__(self, environ, start_response):
+        handling = self._handle(environ, start_response)
+        try:
+            awaitable = handling.send(None)
+        except StopIteration as stop:
+            return stop.value
+        # a coroutine handler (perhaps under a decorator) can't be awaited 
+        # here, so it fails like any other handler error
+        close = getattr(awaitable, 'close', None)
+        if close is not None:
+            close()
+        error_message = 'The handler returned an awaitable, which is only \
+                         supported when serving with Application.asgi'
+        try:
+            handling.throw(TypeError(error_message))
+        except StopIteration as stop:
+            return stop.value
+        raise RuntimeError('Request handling yielded more than once')
+
+    def _handle(self, environ, start_response):
+        """ The request lifecycle shared by WSGI (__call__) and ASGI 
+            (asgi.handle), as a generator: if the handler returns an 
+            awaitable, it's yielded (from within the controller's context) 
+            and the result sent back in is used as the handler's.  Returns 
+            the response's WSGI app_iter.
+        """
+        # per-phase timing, only if metrics are configured
+        timer = None if self.metrics is None else self.metrics.timer()
         request = webob.Request(environ)
-        response = webob.Response()
         # extract relevant details from request
         url = request.path
         method = request.method.lower()
+        if timer is not None:
+            timer.begin('match')
         # find appropriate handler
-        Controller, args, kwargs = routing.match(self.routes, url, method)
+        Controller, args, kwargs = self._match(url, method)
         if Controller is None:
-            response = exceptions.HTTPNotFound()
-            return response(environ, start_response)
-        # instantiate controller and set up handler context
+            if self.error_responses is None:
+                response = exceptions.HTTPNotFound()
+            else:
+                response = 404
+            return self._respond(response, environ, start_response, timer,
+                                 '', method)
+        plan = self._dispatch_plan(Controller, method)
+        if timer is not None:
+            timer.begin('instantiate')
+        # instantiate controller (its response is built only if it's used)
+        # and set up handler context
         try:
-            controller = Controller(request, response, self.configuration)
+            controller = Controller(request, None, self.configuration)
         except:
-            response = classy.exceptions.HTTPServiceUnavailable()
-            return response(environ, start_response)
+            response = exceptions.HTTPServiceUnavailable()
+            return self._respond(response, environ, start_response, timer,
+                                 Controller.__qualname__, method)
+        profiler = self.profiler
+        sample = None if profiler is None else profiler.sample(url, Controller)
+        if sample is not None:
+            sample.start()
+        untouched_response = False
         with controller:
+            if timer is not None:
+                timer.begin('handler')
             # Controller configuration should allow this method
             # NB: this could go outside the with context, but including it here
             # captures all exceptions except 404 and those related to instantiation
-            allowed_methods = getattr(Controller, 'allowed_methods', set())
-            if method not in allowed_methods:
+            if not plan.allowed:
                 raise exceptions.HTTPMethodNotAllowed
-            # extract appropriate handler (this should never fail)
-            handler = getattr(controller, method)
             # call controller and view method
-            returned = handler(*args, **kwargs)
-            controller.__view__(returned)
-        return controller.response(environ, start_response)
+            if plan.handler is None:
+                returned = getattr(controller, method)(*args, **kwargs)
+            else:
+                returned = plan.handler(controller, *args, **kwargs)
+            if type(returned) not in _DIRECT_TYPES and \
+                    inspect.isawaitable(returned):
+                # the profiler samples only the thread it started on
+                if sample is not None:
+                    sample.stop()
+                    sample = None
+                returned = yield returned
+            if timer is not None:
+                timer.begin('view')
+            if plan.default_view and controller._response is None and \
+                    timer is None and type(returned) in _DIRECT_TYPES:
+                # the default view on an untouched response: skip building it
+                untouched_response = True
+            else:
+                controller.__view__(returned)
+        if sample is not None:
+            sample.stop()
+        if untouched_response and controller._response is None:
+            return self._respond_directly(returned, method, start_response)
+        return self._respond(controller.response, environ, start_response,
+                             timer, Controller.__qualname__, method)
+
+    def _dispatch_plan(self, Controller, method):
+        dispatch_plans = self.dispatch_plans
+        if dispatch_plans is None:
+            dispatch_plans = self.dispatch_plans = {}
+        plan = dispatch_plans.get((Controller, method), None)
+        if plan is None:
+            plan = dispatch_plans[(Controller, method)] = \
+                controllers.dispatch_plan(Controller, method)
+        return plan
+
+    def _respond_directly(self, returned, method, start_response):
+        """ Sends what the default __view__ would have made of a fresh
+            webob.Response, without making one.
+        """
+        if isinstance(returned, str):
+            body = returned.encode('utf-8')
+        elif isinstance(returned, bytes):
+            body = returned
+        else:
+            body = b''
+        start_response('200 OK', _DEFAULT_HEADERS + [('Content-Length',
+                                                       str(len(body)))])
+        if method == 'head':
+            return []
+        return [body]
+
+    def _match(self, url, method):
+        """ The controller, arguments and keyword arguments for a path, 
+            from the match cache if the application has one.
+
+        >>> class People(controllers.Controller):
+        ...     def get(self, person_id):
+        ...         pass
+        >>> class Root(controllers.Controller):
+        ...     all_people = People
+        >>> application = Application()
+        >>> application.routes = {}
+        >>> application.add_route('/', Root)
+        >>> application.match_cache = routing.MatchCache(doorkeeper=False)
+        >>> application._match('/all-people/ann-lee', 'get')[1]
+        ('ann-lee',)
+        >>> application._match('/all_people/ann-lee/', 'get')[1]
+        ('ann-lee',)
+        >>> application._match('/all-people/ann_lee', 'get')[1]
+        ('ann_lee',)
+        >>> application.match_cache.statistics['size']
+        1
+
+        """
+        route_trie = self.route_trie
+        if route_trie is None:
+            route_trie = self.route_trie = routing.compile_routes(self.routes)
+        match_cache = self.match_cache
+        if match_cache is None:
+            return routing.match(route_trie, url, method)
+        url = utilities.Url(url)
+        segments = url.segments
+        # keyed on the normalized path, so /a/b-c, /a/b_c and /a/b-c/ share 
+        # an entry; arguments are taken from the path as given, though, so 
+        # a match with arguments is only reused for the same segments
+        match_key = (method, url.normalized_segments)
+        cached = match_cache.get(match_key)
+        if cached is not None:
+            match, matched_segments = cached
+            if matched_segments == segments or not (match[1] or match[2]):
+                return match
+        match = routing.match(route_trie, url, method)
+        match_cache.put(match_key, (match, segments))
+        return match
+
+    async def asgi(self, scope, receive, send):
+        """ The application as an ASGI 3 application (eg, for uvicorn, serve
+            app.asgi); see asgi.handle.
+        """
+        from . import asgi
+        await asgi.handle(self, scope, receive, send)
+
+    def _respond(self, response, environ, start_response, timer,
+                 controller_name, method):
+        """ Sends a response, or a status code if the application has
+            pre-rendered error responses.
+        """
+        if timer is not None:
+            timer.begin('response')
+        app_iter = None
+        if self.error_responses is not None:
+            app_iter = self.error_responses.respond(response, environ,
+                                                    start_response)
+            if app_iter is None and isinstance(response, int):
+                response = exceptions.status_map[response]()
+        if app_iter is None:
+            app_iter = response(environ, start_response)
+        if timer is None:
+            return app_iter
+        return metrics.TimedIterable.wrap(app_iter, environ, timer,
+                                          controller_name, method)
 
     def add_route(self, route, Controller):
         route = utilities.Url(route)
         self.routes[route] = Controller
+        self.route_trie = routing.compile_routes(self.routes)
+        if self.match_cache is not None:
+            self.match_cache.clear()
         
     def add_asset(self, route, path):
         pass
         
-    def serve(self, *args, **kwargs):
+    def serve(self, *args, workers=None, **kwargs):
+        """ Configures the application and serves it with waitress.  If 
+            workers is given, the application is configured once and then 
+            served by that many forked worker processes sharing a single 
+            listening socket (see prefork.PreforkServer).
+        """
+        # the servers are only imported when they're needed
         self.configure()
-        waitress.serve(self, *args, **kwargs)
+        if workers:
+            if args:
+                error_message = 'serve() takes only keyword arguments (eg, \
+                                 host and port) when serving with workers'
+                raise TypeError(error_message)
+            from . import prefork
+            kwargs.setdefault('logger', self.configuration.get('logger', None))
+            prefork.serve(self, workers, **kwargs)
+        else:
+            import waitress
+            waitress.serve(self, *args, **kwargs)
 
 
 app = application = Application()
@@ -0,0 +1,240 @@
+# standard libraries
+import io
+import sys
+import asyncio
+import tempfile
+import concurrent.futures
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('handle', 'environ_from_scope')
+
+
+def environ_from_scope(scope, body=b''):
+    """ Builds a WSGI environ from an ASGI HTTP connection scope, so that
+        controllers see the same webob.Request under either protocol.  The
+        request body, which has already been received in full, is given
+        as bytes or a file positioned at its start; its length is the
+        Content-Length, even for a chunked request.
+
+    >>> scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET',
+    ...          'scheme': 'http', 'path': '/people/bob', 'root_path': '',
+    ...          'query_string': b'page=2', 'client': ('10.0.0.1', 5000),
+    ...          'server': ('example.com', 80),
+    ...          'headers': [(b'host', b'example.com'),
+    ...                      (b'accept', b'text/html'),
+    ...                      (b'accept', b'text/plain')]}
+    >>> import webob
+    >>> request = webob.Request(environ_from_scope(scope))
+    >>> request.url, request.client_addr, request.headers['Accept']
+    ('http://example.com/people/bob?page=2', '10.0.0.1', 'text/html,text/plain')
+    >>> scope['method'] = 'POST'
+    >>> request = webob.Request(environ_from_scope(scope, b'name=bob'))
+    >>> request.content_length, request.POST['name']
+    (8, 'bob')
+
+    """
+    if isinstance(body, bytes):
+        content_length = len(body)
+        body = io.BytesIO(body)
+    else:
+        content_length = body.seek(0, io.SEEK_END)
+        body.seek(0)
+    server = scope.get('server', None) or ('localhost', 80)
+    client = scope.get('client', None) or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode(
+            'latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'asgi.scope': scope,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+    environ['CONTENT_LENGTH'] = str(content_length)
+    return environ
+
+
+def _executor(application):
+    """ The application's bounded pool for synchronous handlers and blocking
+        reads, sized by configuration['asgi_threads'].
+    """
+    executor = getattr(application, 'asgi_executor', None)
+    if executor is None:
+        max_workers = application.configuration.get('asgi_threads', 32)
+        executor = application.asgi_executor = \
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers, thread_name_prefix='classy-asgi')
+    return executor
+
+
+async def handle(application, scope, receive, send):
+    """ Serves one ASGI connection with a classy Application, through the
+        same request lifecycle as WSGI (Application._handle): routing,
+        dispatch plans, controller lifecycle, pre-rendered errors, metrics
+        and the profiler all apply.
+
+        The request body is received in full before the request is
+        handled, without tying up a thread, into a file kept in memory up
+        to configuration['asgi_memory_threshold'] bytes (1 MiB by default)
+        and spooled to disk beyond, so large uploads don't grow memory.
+        The lifecycle runs in a bounded thread pool, so synchronous
+        handlers don't block the event loop; a handler that returns an
+        awaitable (a coroutine function, or one wrapped by a decorator)
+        releases its thread while the awaitable is awaited on the event
+        loop, and the rest of its lifecycle resumes in the pool.  Response
+        bodies other than in-memory lists (eg, static files) are read in
+        the thread pool a block at a time, so slow clients and large files
+        don't tie up a thread or the event loop.
+    """
+    if scope['type'] == 'lifespan':
+        await _lifespan(application, receive, send)
+        return
+    if scope['type'] != 'http':
+        raise ValueError('Unsupported ASGI scope type {!r}'.format(
+            scope['type']))
+    loop = asyncio.get_running_loop()
+    executor = _executor(application)
+    body = await _read_body(receive, loop, executor, 
+                            application.configuration.get(
+                                'asgi_memory_threshold', 1048576))
+    try:
+        await _respond(application, environ_from_scope(scope, body), send,
+                       loop, executor)
+    finally:
+        body.close()
+
+
+async def _respond(application, environ, send, loop, executor):
+    started = []
+    def _start_response(status, headerlist, exc_info=None):
+        started[:] = [status, headerlist]
+    handling = application._handle(environ, _start_response)
+    done, value = await loop.run_in_executor(executor, _step, handling.send,
+                                             None)
+    while not done:
+        try:
+            result = await value
+        except Exception as error:
+            step, argument = handling.throw, error
+        except BaseException:
+            # eg, cancelled: unwind the controller's context
+            handling.close()
+            raise
+        else:
+            step, argument = handling.send, result
+        done, value = await loop.run_in_executor(executor, _step, step,
+                                                 argument)
+    await _send_response(value, started, send, loop, executor)
+
+
+def _step(method, argument):
+    """ Advances request handling (by sending or throwing into it); returns
+        (True, app_iter) once it's finished, or (False, awaitable).
+    """
+    try:
+        return False, method(argument)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+async def _read_body(receive, loop, executor, memory_threshold):
+    """ Receives the whole request body into a file, rewound, that's kept
+        in memory up to memory_threshold bytes and spooled to disk beyond
+        (written from the thread pool, so the event loop never waits on
+        the disk).
+    """
+    body = tempfile.SpooledTemporaryFile(memory_threshold)
+    size = 0
+    more_body = True
+    try:
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            data = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if not data:
+                continue
+            size += len(data)
+            if size > memory_threshold:
+                await loop.run_in_executor(executor, body.write, data)
+            else:
+                body.write(data)
+        body.seek(0)
+    except BaseException:
+        body.close()
+        raise
+    return body
+
+
+async def _send_response(app_iter, started, send, loop, executor):
+    status, headerlist = started
+    await send({'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'),
+                             value.encode('latin-1'))
+                            for name, value in headerlist]})
+    try:
+        if isinstance(app_iter, (list, tuple)):
+            for data in app_iter:
+                if data:
+                    await send({'type': 'http.response.body', 'body': data,
+                                'more_body': True})
+        else:
+            iterator = iter(app_iter)
+            while True:
+                data = await loop.run_in_executor(executor, next, iterator,
+                                                  None)
+                if data is None:
+                    break
+                if data:
+                    await send({'type': 'http.response.body', 'body': data,
+                                'more_body': True})
+    finally:
+        close = getattr(app_iter, 'close', None)
+        if close is not None:
+            await loop.run_in_executor(executor, close)
+    await send({'type': 'http.response.body', 'body': b'',
+                'more_body': False})
+
+
+async def _lifespan(application, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                application.configure()
+            except Exception as error:
+                await send({'type': 'lifespan.startup.failed',
+                            'message': str(error)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor = getattr(application, 'asgi_executor', None)
+            if executor is not None:
+                executor.shutdown(wait=True)
+                application.asgi_executor = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -1,16 +1,220 @@
 # standard libraries
+import os
+import time
+import hmac
+import hashlib
 import functools
 import base64
+import json
+import threading
+import collections
 # third party libraries
 pass
 # first party libraries
 from .. import exceptions
 
+
+class CredentialCache:
+    """ Remembers the outcome of verifying Authorization headers, so that a
+        slow authenticator (eg, a password hash or a directory lookup) runs
+        once per ttl seconds for each set of credentials rather than on
+        every request.  Failures are remembered for negative_ttl seconds,
+        but as entries are per header, that only spares a verification for
+        the same bad credentials replayed; every new guess is a new header.
+
+        Guesses are throttled per username instead: once a username has
+        failed verification max_failures times within failure_window
+        seconds of its first failure, it is locked (is_locked) and further
+        attempts are refused without verifying them until the window ends.
+        The trade-off is that anyone who knows a username can lock its
+        owner out for up to failure_window seconds (clients whose valid
+        credentials are already cached are unaffected); set max_failures
+        to None to turn the throttle off.
+
+        Entries are keyed on an HMAC-SHA256 of the raw header under a key
+        that never leaves the process (random unless one is given); neither
+        the header nor the password is stored.  The cache holds at most
+        max_entries (and failure counts for as many usernames), evicting
+        the least recently used, and every entry and the failure count for
+        a username can be dropped with invalidate (eg, when its password
+        changes).
+
+    >>> cache = CredentialCache(ttl=60, negative_ttl=1, max_failures=2)
+    >>> cache.get('Basic YWxpY2U6c2VjcmV0') is None
+    True
+    >>> cache.put('Basic YWxpY2U6c2VjcmV0', 'alice', True)
+    >>> cache.get('Basic YWxpY2U6c2VjcmV0')
+    ('alice', True)
+    >>> cache.invalidate('alice')
+    >>> cache.get('Basic YWxpY2U6c2VjcmV0') is None
+    True
+    >>> cache.put('Basic Ym9iOmd1ZXNzMQ==', 'bob', False)
+    >>> cache.is_locked('bob')
+    False
+    >>> cache.put('Basic Ym9iOmd1ZXNzMg==', 'bob', False)
+    >>> cache.is_locked('bob'), cache.is_locked('alice')
+    (True, False)
+
+    """
+
+    def __init__(self, ttl=300, negative_ttl=5, max_entries=10000, key=None,
+                 max_failures=10, failure_window=30):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        # username -> [failures, window ends at]
+        self.failures = collections.OrderedDict()
+        if key is None:
+            key = os.urandom(32)
+        self.key = key
+        # digest -> (username, verified, expires at)
+        self.entries = collections.OrderedDict()
+        self.usernames = collections.defaultdict(set)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, header):
+        if isinstance(header, str):
+            header = header.encode('latin-1')
+        return hmac.new(self.key, header, hashlib.sha256).digest()
+
+    def get(self, header):
+        """ Returns (username, verified) for a header, or None if it isn't
+            cached or has expired.
+        """
+        digest = self._digest(header)
+        with self.lock:
+            entry = self.entries.get(digest, None)
+            if entry is None or entry[2] <= time.monotonic():
+                if entry is not None:
+                    self._remove(digest)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return entry[:2]
+
+    def put(self, header, username, verified):
+        """ Remembers the outcome of verifying a header, and counts a
+            failure (or clears the failures) for the username.
+        """
+        if self.max_failures is not None:
+            self._count(username, verified)
+        ttl = self.ttl if verified else self.negative_ttl
+        if not ttl:
+            return
+        digest = self._digest(header)
+        with self.lock:
+            if digest in self.entries:
+                self._remove(digest)
+            self.entries[digest] = (username, verified, time.monotonic() + ttl)
+            self.usernames[username].add(digest)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def is_locked(self, username):
+        """ Whether the username has failed verification max_failures times
+            within the current failure window.
+        """
+        if self.max_failures is None:
+            return False
+        with self.lock:
+            failure = self.failures.get(username, None)
+            if failure is None:
+                return False
+            if failure[1] <= time.monotonic():
+                del self.failures[username]
+                return False
+            return failure[0] >= self.max_failures
+
+    def _count(self, username, verified):
+        with self.lock:
+            if verified:
+                self.failures.pop(username, None)
+                return
+            now = time.monotonic()
+            failure = self.failures.get(username, None)
+            if failure is None or failure[1] <= now:
+                failure = self.failures[username] = \
+                    [0, now + self.failure_window]
+            failure[0] += 1
+            self.failures.move_to_end(username)
+            while len(self.failures) > self.max_entries:
+                self.failures.popitem(last=False)
+
+    def _remove(self, digest):
+        username, _, _ = self.entries.pop(digest)
+        digests = self.usernames[username]
+        digests.discard(digest)
+        if not digests:
+            del self.usernames[username]
+
+    def invalidate(self, username=None):
+        """ Drops every entry and the failure count for the username, or
+            all of them if no username is given.
+        """
+        with self.lock:
+            if username is None:
+                self.entries.clear()
+                self.usernames.clear()
+                self.failures.clear()
+                return
+            self.failures.pop(username, None)
+            for digest in list(self.usernames.get(username, ())):
+                self._remove(digest)
+
+    @property
+    def statistics(self):
+        return {'entries': len(self.entries), 'hits': self.hits,
+                'misses': self.misses}
+
+    def __len__(self):
+        return len(self.entries)
+
+
 class Basic:
+    """ Decorator requiring HTTP Basic authentication for a handler; the
+        authenticator is called with the username and password and returns
+        whether they are valid.  With a CredentialCache, verified (and
+        rejected) credentials are remembered for a while, and usernames
+        with too many recent failures are refused without calling the
+        authenticator (see CredentialCache).
+
+    >>> import webob
+    >>> from classy import controllers
+    >>> verified = []
+    >>> def authenticator(username, password):
+    ...     verified.append(password)
+    ...     return password == 'secret'
+    >>> cache = CredentialCache(max_failures=3)
+    >>> class Private(controllers.Controller):
+    ...     @Basic(authenticator, 'private', cache=cache)
+    ...     def get(self):
+    ...         return 'private'
+    >>> def attempt(password):
+    ...     credentials = base64.b64encode(b'ann:' + password.encode())
+    ...     request = webob.Request.blank('/', headers={
+    ...         'Authorization': 'Basic ' + credentials.decode()})
+    ...     try:
+    ...         return Private(request).get()
+    ...     except exceptions.HTTPUnauthorized as error:
+    ...         return error.code
+    >>> attempt('secret'), [attempt('guess{}'.format(n)) for n in range(5)]
+    ('private', [401, 401, 401, 401, 401])
+    >>> verified
+    ['secret', 'guess0', 'guess1', 'guess2']
+    >>> attempt('secret'), cache.is_locked('ann')
+    ('private', True)
+
+    """
     
-    def __init__(self, authenticator, realm=''):
+    def __init__(self, authenticator, realm='', cache=None):
         self.authenticator = authenticator
         self.realm = realm
+        self.cache = cache
 
     def _raise_exception(self):
         response = exceptions.HTTPUnauthorized()
@@ -22,6 +226,15 @@ class Basic:
         def _wrapper(controller, *args, **kwargs):
             # extract relevant authentication data
             request = controller.request
+            cache = self.cache
+            if cache is not None:
+                header = request.headers.get('Authorization', None)
+                cached = None if header is None else cache.get(header)
+                if cached is not None:
+                    username, verified = cached
+                    if verified:
+                        return handler(controller, *args, **kwargs)
+                    self._raise_exception()
             authorization = request.authorization
             if authorization is None:
                 self._raise_exception()
@@ -29,12 +242,142 @@ class Basic:
                 authorization_type, authorization_data = authorization
                 if authorization_type.lower() != 'basic':
                     self._raise_exception()
-                username, password = base64.b64decode(authorization_data).split(':')
+                credentials = base64.b64decode(authorization_data)
+                username, password = credentials.decode('utf-8').split(':', 1)
             except:
                 self._raise_exception()
+            if cache is not None and cache.is_locked(username):
+                self._raise_exception()
             # attempt basic authentication
-            if self.authenticator(username, password):
+            verified = bool(self.authenticator(username, password))
+            if cache is not None:
+                cache.put(header, username, verified)
+            if verified:
                 return handler(controller, *args, **kwargs)
             else:
                 self._raise_exception()
-        return _wrapper
\ No newline at end of file
+        return _wrapper
+
+
+class Bearer:
+    """ Decorator requiring a bearer token signed with HMAC-SHA256, verified
+        entirely in process: no backend is consulted.  Tokens (made by sign)
+        carry JSON claims, including an expiry ('exp', a POSIX timestamp),
+        and are 'key id.claims.signature' in unpadded URL-safe base64.
+
+        keys maps key ids to secrets; tokens are signed with signing_key_id
+        (by default the first key) and verified against whichever key they
+        name, so keys can be rotated by adding a new key, signing with it
+        and later removing the old one.  Signatures are compared in constant
+        time.  required_claims maps claims to the values they must have (eg,
+        {'aud': 'api'}).  The verified claims are set on the controller as
+        attribute.
+
+    >>> bearer = Bearer({'2024': b'secret'}, required_claims={'aud': 'api'})
+    >>> token = bearer.sign({'sub': 'alice', 'aud': 'api'}, expires_in=60)
+    >>> bearer.verify(token)['sub']
+    'alice'
+    >>> bearer.verify(token[:-2]) is None
+    True
+    >>> bearer.verify(bearer.sign({'sub': 'alice'})) is None
+    True
+    >>> bearer.verify(bearer.sign({'aud': 'api'}, expires_in=-1)) is None
+    True
+
+    """
+
+    def __init__(self, keys, signing_key_id=None, realm='',
+                 required_claims=None, leeway=0, attribute='claims'):
+        if not keys:
+            raise ValueError('Bearer needs at least one key')
+        self.keys = {key_id: key.encode('utf-8') if isinstance(key, str)
+                     else key for key_id, key in keys.items()}
+        if signing_key_id is None:
+            signing_key_id = next(iter(self.keys))
+        self.signing_key_id = signing_key_id
+        self.realm = realm
+        if required_claims is None:
+            required_claims = {}
+        self.required_claims = required_claims
+        self.leeway = leeway
+        self.attribute = attribute
+
+    def _raise_exception(self, error=None):
+        response = exceptions.HTTPUnauthorized()
+        challenge = 'Bearer realm="{}"'.format(self.realm)
+        if error is not None:
+            challenge += ', error="{}"'.format(error)
+        response.headers['WWW-Authenticate'] = challenge
+        raise response
+
+    def sign(self, claims, expires_in=3600):
+        """ Returns a token for the claims, expiring in expires_in seconds
+            unless the claims already hold an 'exp'.
+        """
+        claims = dict(claims)
+        now = int(time.time())
+        claims.setdefault('iat', now)
+        claims.setdefault('exp', now + expires_in)
+        key_id = str(self.signing_key_id)
+        payload = _encode(json.dumps(claims, separators=(',', ':'),
+                                     sort_keys=True).encode('utf-8'))
+        signed = '{}.{}'.format(key_id, payload)
+        signature = hmac.new(self.keys[self.signing_key_id],
+                             signed.encode('ascii'), hashlib.sha256).digest()
+        return '{}.{}'.format(signed, _encode(signature))
+
+    def verify(self, token):
+        """ Returns the token's claims if it is correctly signed by a known
+            key, unexpired and has the required claims, otherwise None.
+        """
+        try:
+            signed, _, signature = token.rpartition('.')
+            key_id, _, payload = signed.partition('.')
+            key = self.keys.get(key_id, None)
+            if key is None or not payload:
+                return None
+            expected_signature = hmac.new(key, signed.encode('ascii'),
+                                          hashlib.sha256).digest()
+            if not hmac.compare_digest(expected_signature, _decode(signature)):
+                return None
+            claims = json.loads(_decode(payload))
+        except (ValueError, TypeError, UnicodeError):
+            return None
+        if not isinstance(claims, dict):
+            return None
+        expires = claims.get('exp', None)
+        if not isinstance(expires, (int, float)) or \
+                expires + self.leeway <= time.time():
+            return None
+        for name, value in self.required_claims.items():
+            if claims.get(name, None) != value:
+                return None
+        return claims
+
+    def __call__(self, handler):
+        @functools.wraps(handler)
+        def _wrapper(controller, *args, **kwargs):
+            authorization = controller.request.authorization
+            if authorization is None:
+                self._raise_exception()
+            try:
+                authorization_type, token = authorization
+            except (TypeError, ValueError):
+                self._raise_exception('invalid_request')
+            if authorization_type.lower() != 'bearer' or \
+                    not isinstance(token, str):
+                self._raise_exception('invalid_request')
+            claims = self.verify(token)
+            if claims is None:
+                self._raise_exception('invalid_token')
+            setattr(controller, self.attribute, claims)
+            return handler(controller, *args, **kwargs)
+        return _wrapper
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
@@ -3,14 +3,15 @@ pass
 # third party libraries
 pass
 # first party libraries
-pass
+from . import (conditional, assets, responses)
+
+file_etag = conditional.file_etag
+is_not_modified = conditional.is_not_modified
+max_age = conditional.max_age
+not_modified = conditional.not_modified
+AssetCache = assets.AssetCache
+CachedAsset = assets.CachedAsset
+ResponseCache = responses.ResponseCache
 
-"""
-if self.cache:
-    etag_hash = hash((file_iterator.last_modified,
-                      file_iterator.content_length,
-                      self.filename))
-    self.response.etag = str(etag_hash)
-    self.response.conditional_response = True
-    self.response.last_modified = file_iterator.last_modified
-"""
\ No newline at end of file
+__all__ = ['file_etag', 'is_not_modified', 'max_age', 'not_modified',
+           'AssetCache', 'CachedAsset', 'ResponseCache', ]
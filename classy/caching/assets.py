@@ -0,0 +1,174 @@
+# standard libraries
+import os
+import time
+import threading
+import collections
+import email.utils
+# third party libraries
+pass
+# first party libraries
+from . import conditional
+
+
+__all__ = ('AssetCache', 'CachedAsset')
+
+
+class CachedAsset:
+    """ The contents of a small file held in memory, along with everything
+        needed to serve it: its content type and encoding, length, entity
+        tag and pre-formatted Last-Modified date.  The body may also be a
+        transformation of the file (eg, compressed), in which case the
+        transformation should be given its own etag.
+    """
+
+    __slots__ = ('filename', 'body', 'content_type', 'content_encoding',
+                 'content_length', 'etag', 'last_modified',
+                 'last_modified_header', 'stat', 'stat_key', 'checked_at')
+
+    def __init__(self, filename, body, stat, content_type=None,
+                 content_encoding=None, etag=None):
+        self.filename = filename
+        self.body = body
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.content_length = len(body)
+        if etag is None:
+            etag = conditional.file_etag(stat)
+        self.etag = etag
+        self.last_modified = stat.st_mtime
+        self.last_modified_header = email.utils.formatdate(stat.st_mtime,
+                                                           usegmt=True)
+        self.stat = stat
+        self.stat_key = _stat_key(stat)
+        self.checked_at = time.monotonic()
+
+
+def _stat_key(stat):
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class AssetCache:
+    """ An in-process LRU cache of small static files, bounded by the total
+        size of the cached files (max_bytes); files larger than
+        max_file_size aren't cached.
+
+        A cached file is re-validated against the file system (with a
+        single stat) at most once every stat_interval seconds, so hot
+        assets are served without any system calls on most requests; a
+        file that has changed or disappeared is dropped from the cache.
+        The cache is safe to share between controllers and threads.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile(suffix='.css') as temporary_file:
+    ...     _ = temporary_file.write(b'body {}')
+    ...     temporary_file.flush()
+    ...     cache = AssetCache(max_bytes=10)
+    ...     cache.get(temporary_file.name) is None
+    ...     asset = cache.load(temporary_file.name, 'text/css')
+    ...     cache.get(temporary_file.name) is asset, asset.body
+    ...     cache.statistics['size']
+    True
+    (True, b'body {}')
+    7
+
+    """
+
+    def __init__(self, max_bytes=67108864, max_file_size=1048576,
+                 stat_interval=1.0):
+        self.max_bytes = max_bytes
+        self.max_file_size = min(max_file_size, max_bytes)
+        self.stat_interval = stat_interval
+        self.assets = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, filename):
+        """ Returns the cached asset for the filename, or None if it isn't
+            cached or has changed on disk.
+        """
+        with self.lock:
+            asset = self.assets.get(filename, None)
+            if asset is None:
+                self.misses += 1
+                return None
+            self.assets.move_to_end(filename)
+        now = time.monotonic()
+        if now - asset.checked_at >= self.stat_interval:
+            try:
+                stat = os.stat(filename)
+            except (IOError, OSError):
+                stat = None
+            if stat is None or _stat_key(stat) != asset.stat_key:
+                self.invalidate(filename)
+                with self.lock:
+                    self.misses += 1
+                return None
+            asset.checked_at = now
+        with self.lock:
+            self.hits += 1
+        return asset
+
+    def load(self, filename, content_type=None, content_encoding=None):
+        """ Reads the file into the cache and returns its asset, or returns
+            None if the file is too large to cache or can't be read.
+        """
+        try:
+            with open(filename, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if stat.st_size > self.max_file_size:
+                    return None
+                body = file.read()
+        except (IOError, OSError):
+            return None
+        if len(body) != stat.st_size:
+            # the file changed while it was being read
+            return None
+        asset = CachedAsset(filename, body, stat, content_type,
+                            content_encoding)
+        return self.put(asset)
+
+    def put(self, asset):
+        """ Caches an asset under its filename; the asset is re-validated 
+            against that file.  Returns the asset.
+        """
+        if asset.content_length > self.max_bytes:
+            return asset
+        with self.lock:
+            previous_asset = self.assets.pop(asset.filename, None)
+            if previous_asset is not None:
+                self.size -= previous_asset.content_length
+            self.assets[asset.filename] = asset
+            self.size += asset.content_length
+            while self.size > self.max_bytes:
+                _, evicted_asset = self.assets.popitem(last=False)
+                self.size -= evicted_asset.content_length
+                self.evictions += 1
+        return asset
+
+    def invalidate(self, filename=None):
+        """ Drops the filename from the cache, or every file if no filename
+            is given.
+        """
+        with self.lock:
+            if filename is None:
+                self.assets.clear()
+                self.size = 0
+                return
+            asset = self.assets.pop(filename, None)
+            if asset is not None:
+                self.size -= asset.content_length
+
+    @property
+    def statistics(self):
+        return {'files': len(self.assets), 'size': self.size,
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+    def __contains__(self, filename):
+        return filename in self.assets
+
+    def __len__(self):
+        return len(self.assets)
@@ -0,0 +1,122 @@
+# standard libraries
+import email.utils
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('file_etag', 'is_not_modified', 'max_age', 'not_modified')
+
+
+def file_etag(stat):
+    """ Returns a strong entity tag for a file given its os.stat result; the
+        tag changes whenever the file's inode, size or modification time
+        (to the nanosecond) does.
+
+    >>> import types
+    >>> stat = types.SimpleNamespace(st_ino=12, st_size=1024,
+    ...                              st_mtime_ns=1434500000 * 10**9)
+    >>> file_etag(stat)
+    '"c-400-13e85e26524c4000"'
+
+    """
+    return '"{:x}-{:x}-{:x}"'.format(stat.st_ino, stat.st_size,
+                                     stat.st_mtime_ns)
+
+
+def _etag_matches(if_none_match, etag):
+    """ Weak comparison (RFC 7232, section 2.3.2) of an entity tag against
+        the value of an If-None-Match header.
+    """
+    if if_none_match.strip() == '*':
+        return True
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """ Evaluates a GET or HEAD request's If-None-Match and If-Modified-Since
+        preconditions (RFC 7232, section 6) against a representation's
+        entity tag and modification time (a POSIX timestamp).  Returns True
+        if a 304 Not Modified response should be sent in its place.  As the
+        RFC requires, If-Modified-Since is ignored when If-None-Match is
+        present.
+
+    >>> import webob
+    >>> request = webob.Request.blank('/', headers={'If-None-Match':
+    ...                                             'W/"a", "b"'})
+    >>> is_not_modified(request, '"a"'), is_not_modified(request, '"c"')
+    (True, False)
+    >>> since = 'Wed, 17 Jun 2015 00:13:20 GMT'
+    >>> request = webob.Request.blank('/', headers={'If-Modified-Since':
+    ...                                             since})
+    >>> is_not_modified(request, '"c"', 1434500000.5)
+    True
+    >>> is_not_modified(request, '"c"', 1434500001)
+    False
+    >>> request.method = 'POST'
+    >>> is_not_modified(request, '"c"', 1434500000)
+    False
+
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    headers = request.headers
+    if_none_match = headers.get('If-None-Match', None)
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = headers.get('If-Modified-Since', None)
+    if if_modified_since is None or last_modified is None:
+        return False
+    parsed_date = email.utils.parsedate_tz(if_modified_since)
+    if parsed_date is None:
+        return False
+    # HTTP dates have a resolution of one second
+    return int(last_modified) <= email.utils.mktime_tz(parsed_date)
+
+
+def max_age(policy, content_type=None):
+    """ Resolves a Cache-Control max-age policy for a content type.  The
+        policy may be None (no Cache-Control header), a number of seconds,
+        or a dict mapping content types, major types (eg, 'image') or '*'
+        to either of those.
+
+    >>> policy = {'text/html': 0, 'image': 86400, '*': 3600}
+    >>> max_age(policy, 'text/html'), max_age(policy, 'image/png')
+    (0, 86400)
+    >>> max_age(policy, 'text/css'), max_age(600, 'text/css')
+    (3600, 600)
+    >>> max_age({'image': 86400}, 'text/css') is None
+    True
+
+    """
+    if not isinstance(policy, dict):
+        return policy
+    if content_type is None:
+        content_type = ''
+    content_type = content_type.split(';')[0].strip().lower()
+    major_type = content_type.split('/')[0]
+    for key in (content_type, major_type, '*'):
+        if key in policy:
+            return policy[key]
+    return None
+
+
+def not_modified(response):
+    """ Turns a response carrying validators (ETag, Last-Modified,
+        Cache-Control) into a body-less 304 Not Modified response.
+    """
+    response.status = 304
+    response.app_iter = []
+    response.content_type = None
+    response.content_length = None
+    response.content_encoding = None
+    return response
@@ -0,0 +1,205 @@
+# standard libraries
+import time
+import functools
+import threading
+import collections
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('ResponseCache', )
+
+
+class _CachedResponse:
+
+    __slots__ = ('status', 'headerlist', 'body', 'size', 'expires_at',
+                 'stale_until', 'refreshing')
+
+    def __init__(self, status, headerlist, body, ttl, stale_while_revalidate):
+        self.status = status
+        self.headerlist = headerlist
+        self.body = body
+        self.size = len(body) + sum(len(name) + len(value)
+                                    for name, value in headerlist)
+        self.expires_at = time.monotonic() + ttl
+        self.stale_until = self.expires_at + stale_while_revalidate
+        self.refreshing = False
+
+
+class ResponseCache:
+    """ Decorator that caches the finished responses (status, headers and
+        body) of a controller's handler.
+
+        Responses are keyed on the controller, the handler, the arguments
+        matched from the URL, the values of the named query_parameters and
+        the values of the named vary request headers (which are also added
+        to the response's Vary header).  Only 200 responses without a
+        Set-Cookie header are cached.  Because the decorator must capture
+        the response as it will be sent, it applies the controller's
+        __view__ itself and returns the response to the application.
+
+        Entries live for ttl seconds and the cache is bounded by max_bytes
+        with LRU eviction.  For stale_while_revalidate seconds after an
+        entry expires, the first request to find it expired recomputes it
+        while concurrent requests are still served the stale copy.
+
+        The same ResponseCache may decorate several handlers, in which case
+        they share the byte budget.
+
+    >>> from classy import controllers
+    >>> import webob
+    >>> response_cache = ResponseCache(ttl=60, query_parameters=('page', ))
+    >>> class People(controllers.Controller):
+    ...
+    ...     calls = 0
+    ...
+    ...     @response_cache
+    ...     def get(self, person_id):
+    ...         People.calls += 1
+    ...         return 'person {}'.format(person_id)
+    ...
+    >>> def get(url):
+    ...     request = webob.Request.blank(url)
+    ...     controller = People(request, webob.Response())
+    ...     return controller.get(url.split('?')[0].split('/')[-1])
+    ...
+    >>> (get('/1').text, get('/1').text, get('/1?page=2').text, People.calls)
+    ('person 1', 'person 1', 'person 1', 2)
+    >>> response_cache.statistics['entries']
+    2
+
+    """
+
+    def __init__(self, ttl=60, max_bytes=16777216, query_parameters=(),
+                 vary=(), stale_while_revalidate=0):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.query_parameters = tuple(query_parameters)
+        self.vary = tuple(vary)
+        self.stale_while_revalidate = stale_while_revalidate
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, handler):
+        @functools.wraps(handler)
+        def _wrapper(controller, *args, **kwargs):
+            key = self._key(controller, handler, args, kwargs)
+            if key is None:
+                return self._compute(controller, handler, args, kwargs)
+            entry = self._lookup(key)
+            if entry is not None:
+                return self._apply(controller, entry)
+            try:
+                response = self._compute(controller, handler, args, kwargs)
+            except BaseException:
+                self._release(key)
+                raise
+            self._store(key, response)
+            return response
+        return _wrapper
+
+    def _key(self, controller, handler, args, kwargs):
+        request = controller.request
+        query = request.GET
+        query_values = tuple(tuple(query.getall(name))
+                             for name in self.query_parameters)
+        headers = request.headers
+        vary_values = tuple(headers.get(name, None) for name in self.vary)
+        key = (type(controller), handler.__name__, args,
+               tuple(sorted(kwargs.items())), query_values, vary_values)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _lookup(self, key):
+        """ Returns the entry to serve, or None if the caller should compute
+            the response (and then store or release it).
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            if now < entry.expires_at:
+                self.hits += 1
+                return entry
+            if now < entry.stale_until and entry.refreshing:
+                self.stale_hits += 1
+                return entry
+            if now < entry.stale_until:
+                # this request revalidates; the rest are served stale
+                entry.refreshing = True
+            self.misses += 1
+            return None
+
+    def _release(self, key):
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is not None:
+                entry.refreshing = False
+
+    def _compute(self, controller, handler, args, kwargs):
+        returned = handler(controller, *args, **kwargs)
+        controller.__view__(returned)
+        response = controller.response
+        if self.vary:
+            vary = tuple(response.vary or ())
+            response.vary = vary + tuple(v for v in self.vary
+                                         if v not in vary)
+        return response
+
+    def _store(self, key, response):
+        cacheable = (response.status_code == 200 and
+                     'Set-Cookie' not in response.headers)
+        if not cacheable:
+            self._release(key)
+            return
+        entry = _CachedResponse(response.status, list(response.headerlist),
+                                response.body, self.ttl,
+                                self.stale_while_revalidate)
+        with self.lock:
+            previous_entry = self.entries.pop(key, None)
+            if previous_entry is not None:
+                self.size -= previous_entry.size
+            if entry.size > self.max_bytes:
+                return
+            self.entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, evicted_entry = self.entries.popitem(last=False)
+                self.size -= evicted_entry.size
+                self.evictions += 1
+
+    def _apply(self, controller, entry):
+        response = controller.response
+        response.status = entry.status
+        response.headerlist = list(entry.headerlist)
+        response.body = entry.body
+        return response
+
+    def invalidate(self, Controller=None):
+        """ Drops every entry, or only those for the given controller. """
+        with self.lock:
+            if Controller is None:
+                self.entries.clear()
+                self.size = 0
+                return
+            for key in [k for k in self.entries if k[0] is Controller]:
+                self.size -= self.entries.pop(key).size
+
+    @property
+    def statistics(self):
+        return {'entries': len(self.entries), 'size': self.size,
+                'hits': self.hits, 'stale_hits': self.stale_hits,
+                'misses': self.misses, 'evictions': self.evictions}
@@ -1,27 +1,66 @@
 # standard libraries
+import sys
+import time
 import datetime
+import types
+import inspect
 import logging
 import traceback
+import collections
+import collections.abc
 # third party libraries
 pass
 # first party libraries
 from . import (utilities, exceptions)
 
 
-__all__ = ('Controller', )
+__all__ = ('Controller', 'DispatchPlan', 'dispatch_plan', 'StreamedBody')
 
 
 class Controller:
     
     allowed_methods = set(('get', 'head', 'put', 'post', 'patch', 'delete'))
+    # streamed responses are sent in writes of up to about this many bytes
+    stream_buffer_size = 65536
     
-    def __init__(self, request, response, configuration=None):
+    def __init__(self, request, response=None, configuration=None):
         self.request = request
-        self.response = response
+        self._response = response
         if configuration is None:
             configuration = {}
         self.configuration = configuration
 
+    @property
+    def response(self):
+        # built on first use, so handlers that never touch it don't pay for it
+        if self._response is None:
+            import webob
+            self._response = webob.Response()
+        return self._response
+
+    @response.setter
+    def response(self, response):
+        self._response = response
+
+    def iter_body(self, block_size=65536, max_size=None):
+        """ Streams the request body in blocks (see uploads.iter_body). """
+        from . import uploads
+        return uploads.iter_body(self.request.environ, block_size, max_size)
+
+    def iter_multipart(self, memory_threshold=1048576, max_size=None):
+        """ Streams the parts of a multipart/form-data body, spooling large
+            ones to disk (see uploads.iter_multipart).
+        """
+        from . import uploads
+        return uploads.iter_multipart(self.request.environ, memory_threshold,
+                                      max_size)
+
+    def __status__(self):
+        """ The response's status code, without building the response. """
+        if self._response is None:
+            return 200
+        return self._response.status_code
+
     @staticmethod
     def __configure__(configuration):
         pass
@@ -31,31 +70,53 @@ class Controller:
             self.response.text = returned
         elif isinstance(returned, bytes):
             self.response.body = returned
+        elif isinstance(returned, collections.abc.Iterator) and \
+                (self._response is None or 
+                 returned is not self._response.app_iter):
+            # an iterator of str or bytes, unless it's already the body
+            self.response.app_iter = StreamedBody(
+                self, returned, self.stream_buffer_size, 
+                self.response.charset or 'utf-8')
+            self.response.app_iter.start()
 
     def __enter__(self):
         return self
         
     def __exit__(self, exception_type, exception_value, exception_traceback):
-        logger = self.configuration.get('logger', None)
-        if logger is None:
-            logger = logging.NullHandler()
+        exception_tuple = (exception_type, exception_value, 
+                           exception_traceback)
         # log and handle any errors
         if exception_value is None:
-            log = self.__log__(exception_type, exception_value, 
-                               exception_traceback)
-            logger.info(log)
+            level = logging.INFO
         elif isinstance(exception_value, exceptions.HTTPException):
             self.response = exception_value
-            log = self.__log__(exception_type, exception_value, 
-                               exception_traceback)
-            logger.warning(log)
+            level = logging.WARNING
         elif isinstance(exception_value, Exception):
             self.response = exceptions.HTTPInternalServerError()
-            log = self.__log__(exception_type, exception_value, 
-                               exception_traceback)
-            logger.error(log)
+            level = logging.ERROR
+        else:
+            return True
+        # with a log queue, formatting and writing happen off the request path
+        log_queue = self.configuration.get('log_queue', None)
+        if log_queue is not None:
+            log_queue.put(level, self.__record__(*exception_tuple))
+        else:
+            logger = self.configuration.get('logger', None)
+            if logger is None:
+                logger = logging.NullHandler()
+            logger.log(level, self.__log__(*exception_tuple))
         # suppress exception reraise in calling routine
         return True
+
+    def __record__(self, *exception_tuple):
+        """ The raw fields of a log line, to be formatted later by
+            log_queue.format_record.
+        """
+        if exception_tuple[1] is None:
+            exception_tuple = None
+        return (time.time(), self.request.client_addr, 
+                self.__status__(), self.request.method, 
+                self.request.path, exception_tuple)
         
     def __log__(self, *exception_tuple):
         exception_is_none = any(map(lambda e: e is None, exception_tuple))
@@ -65,7 +126,7 @@ class Controller:
             exception_message = traceback.format_exception(*exception_tuple)
             exception_message = '\n\n    ' + '    '.join(exception_message)
         now = datetime.datetime.utcnow().isoformat()[:23]
-        status = self.response.status_code
+        status = self.__status__()
         client_address = self.request.client_addr
         method = self.request.method
         path = self.request.path
@@ -79,3 +140,121 @@ class Controller:
     post = utilities._raise_method_not_allowed
     patch = utilities._raise_method_not_allowed
     delete = utilities._raise_method_not_allowed
+
+
+class StreamedBody:
+    """ A response body (WSGI app_iter) streamed from an iterator of str
+        (encoded with encoding) and bytes, such as a generator returned by
+        a handler.  Small pieces are coalesced into writes of at least
+        buffer_size bytes; with no Content-Length, the server sends them
+        with chunked transfer coding.
+
+        start() reads the first write while the controller is still
+        handling the request, so an exception raised before any output is
+        handled like one raised by the handler.  Once the response has
+        started, an exception is logged by the controller and raised again
+        to abort the response.  Closing the body (as the server does when
+        the response ends or the client disconnects) closes the iterator,
+        so a generator's finally blocks run.
+
+    >>> def rows():
+    ...     try:
+    ...         for number in range(5):
+    ...             yield '{}\\n'.format(number)
+    ...     finally:
+    ...         print('closed')
+    ...
+    >>> body = StreamedBody(Controller(None), rows(), buffer_size=4)
+    >>> body.start()
+    >>> for data in body:
+    ...     print(data)
+    ...     break
+    b'0\\n1\\n'
+    >>> body.close()
+    closed
+
+    """
+
+    def __init__(self, controller, iterator, buffer_size=65536,
+                 encoding='utf-8'):
+        self.controller = controller
+        self.iterator = iterator
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.writes = self._coalesce()
+        self.first_write = None
+
+    def start(self):
+        """ Reads the first write. """
+        try:
+            self.first_write = next(self.writes, None)
+        except BaseException:
+            self.close()
+            raise
+
+    def _coalesce(self):
+        buffer = []
+        size = 0
+        for piece in self.iterator:
+            if isinstance(piece, str):
+                piece = piece.encode(self.encoding)
+            buffer.append(piece)
+            size += len(piece)
+            if size >= self.buffer_size:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        if size:
+            yield b''.join(buffer)
+
+    def __iter__(self):
+        first_write, self.first_write = self.first_write, None
+        if first_write is not None:
+            yield first_write
+        try:
+            for data in self.writes:
+                yield data
+        except Exception:
+            # too late for an error response: log it and abort this one
+            self.controller.__exit__(*sys.exc_info())
+            raise
+
+    def close(self):
+        self.writes.close()
+        close = getattr(self.iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+DispatchPlan = collections.namedtuple('DispatchPlan', ('allowed', 'handler',
+                                                       'default_view'))
+
+
+def dispatch_plan(Controller, method):
+    """ Precomputes how the application dispatches a method to a controller:
+        whether allowed_methods permits it, the handler as a plain function
+        to call with the controller (or None if it isn't one, in which case
+        it is looked up on the controller) and whether __view__ is the
+        default one.
+
+    >>> class People(Controller):
+    ...     allowed_methods = set(('get', ))
+    ...     def get(self):
+    ...         return 'people'
+    ...
+    >>> plan = dispatch_plan(People, 'get')
+    >>> plan.allowed, plan.handler is People.get, plan.default_view
+    (True, True, True)
+    >>> dispatch_plan(People, 'post').allowed
+    False
+
+    """
+    allowed = method in getattr(Controller, 'allowed_methods', set())
+    handler = inspect.getattr_static(Controller, method, None)
+    if not isinstance(handler, types.FunctionType):
+        handler = None
+    default_view = Controller.__view__ is _default_view
+    return DispatchPlan(allowed, handler, default_view)
+
+
+_default_view = Controller.__view__
@@ -1,6 +1,132 @@
 # standard libraries
 pass
 # third party libraries
-from webob.exc import *
+pass
 # first party libraries
-pass
\ No newline at end of file
+pass
+
+
+# the statuses ErrorResponses pre-renders by default
+PRERENDERED_STATUSES = (404, 405, 500, 503)
+_CONTENT_TYPES = ('text/html', 'application/json', 'text/plain')
+_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+
+def __getattr__(name):
+    """ The exceptions (and everything else in webob.exc) are webob's,
+        imported on first use so importing classy doesn't load webob.  So
+        is __all__, for "from classy.exceptions import *".
+    """
+    import webob.exc
+    if name == '__all__':
+        return ('ErrorResponses', 'PRERENDERED_STATUSES') + \
+            tuple(webob.exc.__all__)
+    try:
+        value = getattr(webob.exc, name)
+    except AttributeError:
+        error_message = 'module {!r} has no attribute {!r}'
+        raise AttributeError(error_message.format(__name__, name)) from None
+    globals()[name] = value
+    return value
+
+
+class ErrorResponses:
+    """ Immutable (status, headers, body) triples for the common error
+        statuses, rendered by webob once for every request method and
+        content type webob negotiates (HTML, JSON or plain text), so that
+        sending one is only a lookup.  Negotiated Accept headers are
+        remembered too.  Only exceptions raised without a detail, comment
+        or extra headers are sent pre-rendered; HEAD requests and anything
+        else are left to webob.
+
+    >>> import webob
+    >>> error_responses = ErrorResponses()
+    >>> environ = webob.Request.blank('/', headers={'Accept':
+    ...                                             'application/json'}).environ
+    >>> start_response = lambda status, headers: print(status, headers)
+    >>> body = error_responses.respond(404, environ, start_response)
+    404 Not Found [('Content-Length', '112'), ('Content-Type', 'application/json')]
+    >>> body[0][-46:]
+    b'"code": "404 Not Found", "title": "Not Found"}'
+    >>> error_responses.respond(webob.exc.HTTPNotFound('No such person'),
+    ...                         environ, start_response) is None
+    True
+
+    """
+
+    def __init__(self, statuses=PRERENDERED_STATUSES, max_accept_values=1024):
+        import webob.exc
+        from webob.acceptparse import create_accept_header
+        self.status_map = webob.exc.status_map
+        self.create_accept_header = create_accept_header
+        # the headers of an exception made without any arguments
+        self.default_headerlist = list(webob.exc.HTTPNotFound().headerlist)
+        self.statuses = frozenset(statuses)
+        self.max_accept_values = max_accept_values
+        self.responses = {}
+        for status_code in self.statuses:
+            for method in _METHODS:
+                for content_type in _CONTENT_TYPES:
+                    self.responses[(status_code, method, content_type)] = \
+                        _render(status_code, method, content_type)
+        self.negotiated = {}
+
+    def negotiate(self, accept):
+        """ The content type webob would render an error in for an Accept
+            header.
+        """
+        content_type = self.negotiated.get(accept, None)
+        if content_type is None:
+            offers = self.create_accept_header(accept).acceptable_offers(
+                offers=['text/html', 'application/json'])
+            content_type = offers[0][0] if offers else 'text/plain'
+            if len(self.negotiated) >= self.max_accept_values:
+                self.negotiated.clear()
+            self.negotiated[accept] = content_type
+        return content_type
+
+    def prerendered_status(self, exception):
+        """ The status code of an exception that can be sent pre-rendered,
+            or None if it carries anything of its own.
+        """
+        status_code = getattr(exception, 'code', None)
+        if status_code not in self.statuses or \
+                type(exception) is not self.status_map[status_code]:
+            return None
+        if exception.detail is not None or exception.comment is not None or \
+                exception.headerlist != self.default_headerlist:
+            return None
+        return status_code
+
+    def respond(self, response, environ, start_response):
+        """ Sends the pre-rendered error for a status code or exception as a
+            WSGI response, returning its body; returns None if there isn't
+            one.
+        """
+        if isinstance(response, int):
+            status_code = response
+        else:
+            status_code = self.prerendered_status(response)
+            if status_code is None:
+                return None
+        content_type = self.negotiate(environ.get('HTTP_ACCEPT', ''))
+        prerendered = self.responses.get(
+            (status_code, environ['REQUEST_METHOD'], content_type), None)
+        if prerendered is None:
+            return None
+        status, headerlist, body = prerendered
+        start_response(status, list(headerlist))
+        return [body]
+
+
+def _render(status_code, method, content_type):
+    import webob
+    import webob.exc
+    request = webob.Request.blank('/', method=method,
+                                  headers={'Accept': content_type})
+    started = []
+    def _start_response(status, headerlist, exc_info=None):
+        started[:] = [status, tuple(headerlist)]
+    exception = webob.exc.status_map[status_code]()
+    body = b''.join(exception(request.environ, _start_response))
+    return (started[0], started[1], body)
@@ -0,0 +1,161 @@
+# standard libraries
+import os
+import queue
+import atexit
+import weakref
+import datetime
+import threading
+import traceback
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('LogQueue', 'format_record', 'close_all')
+
+
+_log_queues = weakref.WeakSet()
+_stop = object()
+
+
+def format_record(record):
+    """ Formats a request record, as made by Controller.__record__, into the
+        same line Controller.__log__ would have produced.
+
+    >>> format_record((1434500000.25, '127.0.0.1', 200, 'GET', '/', None))
+    '2015-06-17T00:13:20.250 127.0.0.1       200 GET / '
+
+    """
+    timestamp, client_address, status, method, path, exception_tuple = record
+    if exception_tuple is None:
+        exception_message = ''
+    else:
+        exception_message = traceback.format_exception(*exception_tuple)
+        exception_message = '\n\n    ' + '    '.join(exception_message)
+    now = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    now = now.replace(tzinfo=None).isoformat(timespec='microseconds')[:23]
+    return '{} {} {} {} {} {}'.format(now, client_address.ljust(15), status,
+                                      method, path, exception_message)
+
+
+class LogQueue:
+    """ Takes request logging off the request path: controllers put a tuple
+        of raw fields on a bounded in-memory queue, and a background thread
+        formats them and writes them to the logger in batches.
+
+        When the queue is full, the 'drop' policy discards the record (and
+        counts it in dropped) while the 'block' policy waits for room.  The
+        thread is started on first use in each process, so a LogQueue made
+        before forking (eg, by a pre-fork server) works in every worker.
+        Queued records are flushed when the interpreter exits, or by
+        close_all().
+
+    >>> import logging
+    >>> class ListHandler(logging.Handler):
+    ...     def emit(self, record):
+    ...         lines.append(record.getMessage())
+    ...
+    >>> lines = []
+    >>> logger = logging.getLogger('classy.log_queue.test')
+    >>> logger.addHandler(ListHandler())
+    >>> logger.setLevel(logging.INFO)
+    >>> log_queue = LogQueue(logger)
+    >>> log_queue.put(logging.INFO, (0, '10.0.0.1', 404, 'GET', '/x', None))
+    True
+    >>> log_queue.flush()
+    >>> lines
+    ['1970-01-01T00:00:00.000 10.0.0.1        404 GET /x ']
+
+    """
+
+    def __init__(self, logger, max_size=10000, policy='drop', batch_size=256):
+        if policy not in ('drop', 'block'):
+            raise ValueError('LogQueue policy must be \'drop\' or \'block\', '
+                             'not {!r}'.format(policy))
+        self.logger = logger
+        self.max_size = max_size
+        self.policy = policy
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.pid = None
+        _log_queues.add(self)
+
+    def _start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # a new process (or the first use): the parent's thread is gone
+            self.queue = queue.Queue(self.max_size)
+            self.thread = threading.Thread(target=self._run,
+                                           args=(self.queue, ),
+                                           name='classy-log-queue',
+                                           daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def put(self, level, record):
+        """ Queues a record for logging at level.  Returns False if the
+            record was dropped because the queue is full.
+        """
+        if self.pid != os.getpid():
+            self._start()
+        if self.policy == 'block':
+            self.queue.put((level, record))
+            return True
+        try:
+            self.queue.put_nowait((level, record))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self, records):
+        logger = self.logger
+        batch_size = self.batch_size
+        while True:
+            batch = [records.get()]
+            try:
+                while len(batch) < batch_size:
+                    batch.append(records.get_nowait())
+            except queue.Empty:
+                pass
+            for item in batch:
+                if item is _stop:
+                    continue
+                level, record = item
+                try:
+                    logger.log(level, format_record(record))
+                except Exception:
+                    pass
+            for item in batch:
+                records.task_done()
+            if any(item is _stop for item in batch):
+                return
+
+    def flush(self):
+        """ Waits until every queued record has been written. """
+        if self.pid == os.getpid() and self.thread.is_alive():
+            self.queue.join()
+
+    def close(self, timeout=5.0):
+        """ Writes the queued records and stops the background thread. """
+        with self.lock:
+            if self.pid != os.getpid() or not self.thread.is_alive():
+                return
+            self.pid = None
+            records, thread = self.queue, self.thread
+        records.put(_stop)
+        thread.join(timeout)
+
+
+def close_all():
+    """ Flushes and stops every LogQueue in this process. """
+    for log_queue in list(_log_queues):
+        log_queue.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,219 @@
+# standard libraries
+import time
+import bisect
+import threading
+# third party libraries
+pass
+# first party libraries
+from . import (controllers, exceptions)
+
+
+__all__ = ('Metrics', 'RequestTimer', 'TimedIterable', 'MetricsController',
+           'BUCKETS', 'PHASES')
+
+
+# upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# the phases of Application.__call__, in order
+PHASES = ('request', 'match', 'instantiate', 'handler', 'view', 'response')
+
+
+class Metrics:
+    """ Per-phase request latency histograms, aggregated per controller and
+        method.  Each thread records into its own counters, so recording
+        takes no locks; the counters of every thread are summed when the
+        metrics are rendered (in the Prometheus text exposition format).
+
+    >>> metrics = Metrics(buckets=(0.001, 0.01))
+    >>> metrics.observe('People', 'get', 'handler', 0.005, 0.004)
+    >>> metrics.observe('People', 'get', 'handler', 0.5, 0.1)
+    >>> print(metrics.render())  # doctest: +ELLIPSIS
+    # HELP classy_request_phase_seconds Wall time spent in each phase ...
+    # TYPE classy_request_phase_seconds histogram
+    classy_request_phase_seconds_bucket{controller="People",method="get",phase="handler",le="0.001"} 0
+    classy_request_phase_seconds_bucket{controller="People",method="get",phase="handler",le="0.01"} 1
+    classy_request_phase_seconds_bucket{controller="People",method="get",phase="handler",le="+Inf"} 2
+    classy_request_phase_seconds_sum{controller="People",method="get",phase="handler"} 0.505
+    classy_request_phase_seconds_count{controller="People",method="get",phase="handler"} 2
+    # HELP classy_request_phase_cpu_seconds_total CPU time spent in each ...
+    # TYPE classy_request_phase_cpu_seconds_total counter
+    classy_request_phase_cpu_seconds_total{controller="People",method="get",phase="handler"} 0.104
+    <BLANKLINE>
+
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.local = threading.local()
+        self.thread_counters = []
+        self.lock = threading.Lock()
+
+    def _counters(self):
+        try:
+            return self.local.counters
+        except AttributeError:
+            counters = self.local.counters = {}
+            with self.lock:
+                self.thread_counters.append(counters)
+            return counters
+
+    def timer(self):
+        """ Starts timing a request (in its 'request' phase). """
+        return RequestTimer(self)
+
+    def observe(self, controller, method, phase, wall, cpu):
+        counters = self._counters()
+        key = (controller, method, phase)
+        counter = counters.get(key, None)
+        if counter is None:
+            # bucket counts (the last is +Inf), wall sum, cpu sum
+            counter = counters[key] = [[0] * (len(self.buckets) + 1), 0.0, 0.0]
+        counter[0][bisect.bisect_left(self.buckets, wall)] += 1
+        counter[1] += wall
+        counter[2] += cpu
+
+    def collect(self):
+        """ Sums the counters of every thread, returning a dict of
+            (controller, method, phase) to [bucket counts, wall sum, cpu sum].
+        """
+        with self.lock:
+            thread_counters = list(self.thread_counters)
+        totals = {}
+        for counters in thread_counters:
+            for key, (counts, wall, cpu) in list(counters.items()):
+                total = totals.get(key, None)
+                if total is None:
+                    total = totals[key] = [[0] * len(counts), 0.0, 0.0]
+                total[0] = [t + c for t, c in zip(total[0], counts)]
+                total[1] += wall
+                total[2] += cpu
+        return totals
+
+    def render(self):
+        totals = sorted(self.collect().items(), key=_phase_order)
+        bounds = [_format_number(b) for b in self.buckets] + ['+Inf']
+        lines = ['# HELP classy_request_phase_seconds Wall time spent in '
+                 'each phase of a request.',
+                 '# TYPE classy_request_phase_seconds histogram']
+        for key, (counts, wall, cpu) in totals:
+            labels = _labels(key)
+            cumulative_count = 0
+            for bound, count in zip(bounds, counts):
+                cumulative_count += count
+                lines.append('classy_request_phase_seconds_bucket{{{},le="{}"}}'
+                             ' {}'.format(labels, bound, cumulative_count))
+            lines.append('classy_request_phase_seconds_sum{{{}}} {}'.format(
+                labels, _format_number(wall)))
+            lines.append('classy_request_phase_seconds_count{{{}}} {}'.format(
+                labels, cumulative_count))
+        lines.extend(['# HELP classy_request_phase_cpu_seconds_total CPU time '
+                      'spent in each phase of a request.',
+                      '# TYPE classy_request_phase_cpu_seconds_total counter'])
+        for key, (counts, wall, cpu) in totals:
+            lines.append('classy_request_phase_cpu_seconds_total{{{}}} {}'
+                         .format(_labels(key), _format_number(cpu)))
+        return '\n'.join(lines) + '\n'
+
+
+def _phase_order(item):
+    controller, method, phase = item[0]
+    return (controller, method, PHASES.index(phase)
+            if phase in PHASES else len(PHASES), phase)
+
+
+def _format_number(number):
+    return repr(round(number, 9))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n',
+                                                                   '\\n')
+
+
+def _labels(key):
+    controller, method, phase = key
+    return 'controller="{}",method="{}",phase="{}"'.format(
+        _escape(controller), _escape(method), _escape(phase))
+
+
+class RequestTimer:
+    """ Times the phases of one request: begin() ends the current phase and
+        starts the next, and finish() ends the last phase and records every
+        phase against the request's controller and method.
+    """
+
+    __slots__ = ('metrics', 'phases', 'phase', 'wall', 'cpu')
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.phases = []
+        self.phase = 'request'
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def begin(self, phase):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        self.phases.append((self.phase, wall - self.wall, cpu - self.cpu))
+        self.phase, self.wall, self.cpu = phase, wall, cpu
+
+    def finish(self, controller, method):
+        self.begin(None)
+        observe = self.metrics.observe
+        for phase, wall, cpu in self.phases:
+            observe(controller, method, phase, wall, cpu)
+
+
+class TimedIterable:
+    """ Wraps a WSGI response iterable to time its iteration (the
+        'response' phase), finishing the request's timer when the server
+        closes it.  A wsgi.file_wrapper isn't wrapped, so the server can
+        still send it efficiently; its response phase ends immediately.
+    """
+
+    @classmethod
+    def wrap(cls, app_iter, environ, timer, controller, method):
+        file_wrapper = environ.get('wsgi.file_wrapper', None)
+        if isinstance(file_wrapper, type) and \
+                isinstance(app_iter, file_wrapper):
+            timer.finish(controller, method)
+            return app_iter
+        return cls(app_iter, timer, controller, method)
+
+    def __init__(self, app_iter, timer, controller, method):
+        self.app_iter = app_iter
+        self.timer = timer
+        self.controller = controller
+        self.method = method
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        try:
+            close = getattr(self.app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.timer.finish(self.controller, self.method)
+
+
+class MetricsController(controllers.Controller):
+    """ Exposes the application's metrics in the Prometheus text format, eg,
+        app.add_route('/metrics', metrics.MetricsController).  Uses the
+        metrics class attribute if set, otherwise configuration['metrics'].
+    """
+
+    metrics = None
+
+    def get(self):
+        metrics = self.metrics
+        if metrics is None:
+            metrics = self.configuration.get('metrics', None)
+        if not isinstance(metrics, Metrics):
+            raise exceptions.HTTPNotFound
+        self.response.content_type = 'text/plain'
+        self.response.charset = 'utf-8'
+        self.response.headers['Content-Type'] += '; version=0.0.4'
+        return metrics.render()
+
@@ -0,0 +1,243 @@
+# standard libraries
+import os
+import socket
+import signal
+import time
+import logging
+# third party libraries
+pass
+# first party libraries
+from . import log_queue
+
+
+__all__ = ('PreforkServer', 'serve')
+
+
+class PreforkServer:
+    """ Serves a WSGI application from several forked worker processes that
+        share one listening socket, so CPU-bound request handling isn't
+        limited to a single core by the GIL.
+
+        The master process binds the socket and forks the workers (each of
+        which runs a waitress server on the inherited socket), then
+        supervises them:
+
+        * a worker that exits unexpectedly is replaced; if workers keep 
+          exiting within fast_exit_time seconds of starting (eg, because 
+          the application fails at startup), replacements are delayed by 
+          an exponential backoff (from backoff seconds, doubling up to 
+          max_backoff), and after max_fast_exits consecutive fast exits 
+          the server gives up and run raises RuntimeError;
+        * SIGTERM or SIGINT stops the workers gracefully (SIGKILL after
+          graceful_timeout seconds) and then the master;
+        * SIGHUP restarts the workers one at a time, starting each
+          replacement before stopping the worker it replaces.
+
+        The application should be configured before the server is run so
+        configuration happens once, in the master, rather than per worker.
+    """
+
+    def __init__(self, application, workers, host='0.0.0.0', port=8080,
+                 backlog=1024, graceful_timeout=30, logger=None,
+                 fast_exit_time=5, max_fast_exits=10, backoff=0.5,
+                 max_backoff=30, **kwargs):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('Pre-fork serving requires os.fork.')
+        if workers < 1:
+            raise ValueError('At least one worker is required.')
+        for name in ('listen', 'sockets', 'unix_socket'):
+            if name in kwargs:
+                error_message = '{} may not be set when serving with \
+                                 workers; use host and port'.format(name)
+                raise ValueError(error_message)
+        if logger is None:
+            logger = logging.getLogger('classy')
+        self.application = application
+        self.workers = workers
+        self.host = host
+        self.port = int(port)
+        self.backlog = backlog
+        self.graceful_timeout = graceful_timeout
+        self.fast_exit_time = fast_exit_time
+        self.max_fast_exits = max_fast_exits
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.logger = logger
+        self.server_kwargs = kwargs
+        self.socket = None
+        self.worker_pids = set()
+        self.worker_started = {}
+        self.fast_exits = 0
+        self.respawn_at = 0
+        self.stopping = False
+        self.reloading = False
+
+    def bind(self):
+        address_info = socket.getaddrinfo(self.host, self.port,
+                                          socket.AF_UNSPEC, socket.SOCK_STREAM,
+                                          0, socket.AI_PASSIVE)
+        family, socket_type, protocol, _, address = address_info[0]
+        listening_socket = socket.socket(family, socket_type, protocol)
+        listening_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listening_socket.bind(address)
+        listening_socket.listen(self.backlog)
+        listening_socket.setblocking(False)
+        self.socket = listening_socket
+        return listening_socket
+
+    def run(self):
+        if self.socket is None:
+            self.bind()
+        host, port = self.socket.getsockname()[:2]
+        self.logger.info('Serving on http://{}:{} with {} workers'.format(
+            host, port, self.workers))
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        try:
+            for _ in range(self.workers):
+                self.spawn_worker()
+            while not self.stopping:
+                if self.reloading:
+                    self.reloading = False
+                    self.restart_workers()
+                self.reap_workers()
+                if self.fast_exits >= self.max_fast_exits:
+                    error_message = 'Workers exited within {} seconds of \
+                                     starting {} times in a row; giving \
+                                     up'.format(self.fast_exit_time, 
+                                                self.fast_exits)
+                    raise RuntimeError(error_message)
+                if time.monotonic() >= self.respawn_at:
+                    while len(self.worker_pids) < self.workers:
+                        self.spawn_worker()
+                time.sleep(0.5)
+        finally:
+            self.stop_workers()
+            self.socket.close()
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid != 0:
+            self.worker_pids.add(pid)
+            self.worker_started[pid] = time.monotonic()
+            return pid
+        # worker process: never return into the master's supervision loop
+        exit_status = 0
+        try:
+            self._run_worker()
+        except SystemExit:
+            pass
+        except BaseException:
+            self.logger.exception('Worker {} failed'.format(os.getpid()))
+            exit_status = 1
+        finally:
+            # os._exit skips atexit, so flush any queued request logs first
+            log_queue.close_all()
+            os._exit(exit_status)
+
+    def _run_worker(self):
+        import waitress
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, _raise_system_exit)
+        server = waitress.create_server(self.application,
+                                        sockets=[self.socket],
+                                        **self.server_kwargs)
+        # waitress stops accepting and drains its task queue on SystemExit
+        server.run()
+
+    def reap_workers(self):
+        while self.worker_pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.worker_pids.clear()
+                return
+            if pid == 0:
+                return
+            if pid in self.worker_pids:
+                self.worker_pids.discard(pid)
+                started = self.worker_started.pop(pid, None)
+                if not self.stopping:
+                    self.logger.error('Worker {} exited unexpectedly with '
+                                      'status {}'.format(pid, status))
+                    self._count_exit(started)
+
+    def _count_exit(self, started):
+        """ Delays the next respawn if the worker exited soon after it 
+            started.
+        """
+        now = time.monotonic()
+        if started is None or now - started >= self.fast_exit_time:
+            self.fast_exits = 0
+            return
+        self.fast_exits += 1
+        delay = min(self.backoff * 2 ** (self.fast_exits - 1), 
+                    self.max_backoff)
+        self.respawn_at = now + delay
+        self.logger.error('Worker exited within {} seconds of starting; '
+                          'respawning in {} seconds'.format(
+                              self.fast_exit_time, delay))
+
+    def restart_workers(self):
+        for pid in list(self.worker_pids):
+            if self.stopping:
+                return
+            self.spawn_worker()
+            self.stop_worker(pid)
+
+    def stop_worker(self, pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self._wait_for_workers([pid])
+
+    def stop_workers(self):
+        self.stopping = True
+        pids = list(self.worker_pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        self._wait_for_workers(pids)
+
+    def _wait_for_workers(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        pids = set(pids)
+        while pids:
+            for pid in list(pids):
+                try:
+                    exited_pid, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    exited_pid = pid
+                if exited_pid == pid:
+                    pids.discard(pid)
+                    self.worker_pids.discard(pid)
+                    self.worker_started.pop(pid, None)
+            if pids and time.monotonic() > deadline:
+                for pid in pids:
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                deadline = float('inf')
+            if pids:
+                time.sleep(0.05)
+
+    def _handle_stop(self, signal_number, frame):
+        self.stopping = True
+
+    def _handle_reload(self, signal_number, frame):
+        self.reloading = True
+
+
+def _raise_system_exit(signal_number, frame):
+    raise SystemExit(0)
+
+
+def serve(application, workers, **kwargs):
+    server = PreforkServer(application, workers, **kwargs)
+    server.run()
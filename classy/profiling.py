@@ -0,0 +1,264 @@
+# standard libraries
+import io
+import os
+import sys
+import time
+import pstats
+import signal
+import cProfile
+import itertools
+import threading
+import collections
+# third party libraries
+pass
+# first party libraries
+from . import (controllers, exceptions)
+
+
+__all__ = ('Profiler', 'ProfilerController')
+
+
+class Profiler:
+    """ Profiles one in every (every) requests, of those matching the optional
+        route prefix and controller classes, and aggregates the results in
+        memory, for diagnosing slow routes in production.
+
+        In 'cprofile' mode each sampled request runs under cProfile and the
+        results are merged into one pstats.Stats; only one request is
+        profiled at a time, the rest are skipped.  In 'stack' mode a
+        background thread captures the stacks of the threads serving
+        sampled requests every interval seconds and counts them as
+        collapsed stacks (the input format of flamegraph.pl).  Unsampled
+        requests only pay for a counter and a comparison.
+
+        Results are written with dump(), from a signal handler installed by
+        install_signal_handler() or read through a ProfilerController.
+
+    >>> from classy import controllers
+    >>> class Slow(controllers.Controller):
+    ...     pass
+    ...
+    >>> profiler = Profiler(every=2, prefix='/slow', mode='stack')
+    >>> profiler.sample('/fast', Slow) is None
+    True
+    >>> [profiler.sample('/slow/1', Slow) is None for _ in range(4)]
+    [False, True, False, True]
+
+    """
+
+    def __init__(self, every=100, prefix=None, controllers=None,
+                 mode='cprofile', interval=0.005):
+        if mode not in ('cprofile', 'stack'):
+            raise ValueError('Profiler mode must be \'cprofile\' or '
+                             '\'stack\', not {!r}'.format(mode))
+        self.every = every
+        self.prefix = prefix
+        if controllers is not None:
+            controllers = tuple(controllers)
+        self.controllers = controllers
+        self.mode = mode
+        self.interval = interval
+        self.counter = itertools.count()
+        # reentrant, as the signal handler may interrupt a holder
+        self.lock = threading.RLock()
+        self.samples = 0
+        # cprofile mode
+        self.profile_lock = threading.Lock()
+        self.stats = None
+        # stack mode
+        self.stacks = collections.Counter()
+        self.sampled_threads = set()
+        # set while any thread is being sampled; the sampler waits on it
+        self.sampling = threading.Event()
+        self.sampler_thread = None
+
+    def sample(self, path, Controller):
+        """ Returns a _Sample to start and stop around the request if it
+            should be profiled, otherwise None.
+        """
+        if self.prefix is not None and not path.startswith(self.prefix):
+            return None
+        if self.controllers is not None and \
+                not issubclass(Controller, self.controllers):
+            return None
+        if next(self.counter) % self.every:
+            return None
+        if self.mode == 'cprofile':
+            return _ProfileSample(self)
+        return _StackSample(self)
+
+    def _add_profile(self, profile):
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.samples += 1
+
+    def _ensure_sampler(self):
+        with self.lock:
+            if self.sampler_thread is not None and \
+                    self.sampler_thread.is_alive():
+                return
+            self.sampler_thread = threading.Thread(
+                target=self._run_sampler, name='classy-profiler', daemon=True)
+            self.sampler_thread.start()
+
+    def _run_sampler(self):
+        while True:
+            # parked while no thread is being sampled
+            self.sampling.wait()
+            with self.lock:
+                thread_ids = list(self.sampled_threads)
+            if thread_ids:
+                frames = sys._current_frames()
+                stacks = [_collapse(frames[thread_id]) 
+                          for thread_id in thread_ids if thread_id in frames]
+                del frames
+                with self.lock:
+                    self.stacks.update(stacks)
+            time.sleep(self.interval)
+
+    def collapsed(self):
+        """ The sampled stacks, one 'frame;frame;frame count' per line. """
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        return ''.join('{} {}\n'.format(stack, count)
+                       for stack, count in stacks)
+
+    def report(self, sort='cumulative', limit=50):
+        """ The aggregated cProfile results as pstats text. """
+        with self.lock:
+            if self.stats is None:
+                return ''
+            output = io.StringIO()
+            self.stats.stream = output
+            self.stats.sort_stats(sort).print_stats(limit)
+            self.stats.stream = sys.stdout
+        return output.getvalue()
+
+    def dump(self, directory='.'):
+        """ Writes the results so far to classy-<pid>.pstats (cprofile mode)
+            or classy-<pid>.collapsed (stack mode) in the directory, and
+            returns the filename.
+        """
+        basename = os.path.join(directory, 'classy-{}'.format(os.getpid()))
+        if self.mode == 'cprofile':
+            filename = basename + '.pstats'
+            with self.lock:
+                if self.stats is None:
+                    return None
+                self.stats.dump_stats(filename)
+        else:
+            filename = basename + '.collapsed'
+            with open(filename, 'w') as file:
+                file.write(self.collapsed())
+        return filename
+
+    def reset(self):
+        with self.lock:
+            self.stats = None
+            self.stacks = collections.Counter()
+            self.samples = 0
+
+    def install_signal_handler(self, signal_number=signal.SIGUSR2,
+                               directory='.'):
+        """ Dumps the results whenever the process receives signal_number;
+            must be called from the main thread.
+        """
+        def _dump(signal_number, frame):
+            self.dump(directory)
+        signal.signal(signal_number, _dump)
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('{}:{}'.format(os.path.basename(code.co_filename),
+                                    code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class _ProfileSample:
+
+    __slots__ = ('profiler', 'profile')
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.profile = None
+
+    def start(self):
+        # cProfile can't profile two requests at once; skip this one
+        if not self.profiler.profile_lock.acquire(blocking=False):
+            return
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        if self.profile is None:
+            return
+        self.profile.disable()
+        self.profiler.profile_lock.release()
+        self.profiler._add_profile(self.profile)
+
+
+class _StackSample:
+
+    __slots__ = ('profiler', 'thread_id')
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.thread_id = threading.get_ident()
+
+    def start(self):
+        profiler = self.profiler
+        profiler._ensure_sampler()
+        with profiler.lock:
+            profiler.sampled_threads.add(self.thread_id)
+            profiler.samples += 1
+            profiler.sampling.set()
+
+    def stop(self):
+        profiler = self.profiler
+        with profiler.lock:
+            profiler.sampled_threads.discard(self.thread_id)
+            if not profiler.sampled_threads:
+                profiler.sampling.clear()
+
+
+class ProfilerController(controllers.Controller):
+    """ Serves the profiler's results: collapsed stacks in stack mode, or
+        pstats text in cprofile mode (sorted by the 'sort' query parameter).
+        A DELETE discards the results.  Uses the profiler class attribute if
+        set, otherwise configuration['profiler'].  Mount it somewhere only
+        administrators can reach.
+    """
+
+    profiler = None
+
+    def _profiler(self):
+        profiler = self.profiler
+        if profiler is None:
+            profiler = self.configuration.get('profiler', None)
+        if profiler is None:
+            raise exceptions.HTTPNotFound
+        return profiler
+
+    def get(self):
+        profiler = self._profiler()
+        self.response.content_type = 'text/plain'
+        self.response.charset = 'utf-8'
+        if profiler.mode == 'stack':
+            return profiler.collapsed()
+        sort = self.request.GET.get('sort', 'cumulative')
+        try:
+            return profiler.report(sort)
+        except KeyError:
+            raise exceptions.HTTPBadRequest('Unknown sort key {!r}'.format(
+                sort))
+
+    def delete(self):
+        self._profiler().reset()
+        self.response.status = 204
@@ -2,12 +2,311 @@
 import inspect
 import collections
 import copy
+import threading
 # third party libraries
-import webob
+pass
 # first party libraries
 from . import (exceptions, controllers, utilities)
 
 
+_HTTP_METHODS = ('get', 'head', 'put', 'post', 'patch', 'delete', 'options')
+
+
+_POSITIONAL_ONLY = inspect.Parameter.POSITIONAL_ONLY
+_POSITIONAL_OR_KEYWORD = inspect.Parameter.POSITIONAL_OR_KEYWORD
+_VAR_POSITIONAL = inspect.Parameter.VAR_POSITIONAL
+_KEYWORD_ONLY = inspect.Parameter.KEYWORD_ONLY
+_VAR_KEYWORD = inspect.Parameter.VAR_KEYWORD
+
+
+class HandlerSignature:
+    """ Precomputed analysis of a handler method's signature: the names of 
+        its positional parameters, its defaults, whether it accepts *args 
+        and/or **kwargs, and the bounds on how many arguments it accepts.
+
+        The bind method follows the rules of inspect.Signature.bind, but 
+        returns None rather than raising TypeError when the arguments don't 
+        fit, and first rejects most non-matches with a cheap arity check; 
+        during routing, nearly every attempted bind is a non-match.
+
+    >>> def get(self, person_id, scan_id=None, *args, **kwargs):
+    ...     pass
+    ...
+    >>> handler_signature = HandlerSignature(get)
+    >>> handler_signature.positional_names
+    ('self', 'person_id', 'scan_id')
+    >>> (handler_signature.var_positional, handler_signature.var_keyword)
+    ('args', 'kwargs')
+    >>> handler_signature.bind(['self'], {}) is None
+    True
+    >>> arguments = handler_signature.bind(['self', '1', '2', '3'], {'a': 4})
+    >>> arguments == {'self': 'self', 'person_id': '1', 'scan_id': '2', 
+    ...               'args': ('3', ), 'kwargs': {'a': 4}}
+    True
+    >>> handler_signature.split(arguments)
+    (('self', '1', '2', '3'), {'a': 4})
+    >>> del arguments['self']
+    >>> handler_signature.split(arguments)
+    ((), {'person_id': '1', 'scan_id': '2', 'args': ('3',), 'a': 4})
+
+    """
+
+    def __init__(self, handler):
+        self.signature = inspect.signature(handler)
+        self.parameters = tuple((parameter.name, parameter.kind) 
+                                for parameter 
+                                in self.signature.parameters.values())
+        self.positional_names = tuple(
+            name for name, kind in self.parameters
+            if kind in (_POSITIONAL_ONLY, _POSITIONAL_OR_KEYWORD))
+        self.positional_only_names = frozenset(
+            name for name, kind in self.parameters if kind == _POSITIONAL_ONLY)
+        self.defaults = collections.OrderedDict(
+            (parameter.name, parameter.default) 
+            for parameter in self.signature.parameters.values()
+            if parameter.default is not parameter.empty)
+        self.var_positional = None
+        self.var_keyword = None
+        for name, kind in self.parameters:
+            if kind == _VAR_POSITIONAL:
+                self.var_positional = name
+            elif kind == _VAR_KEYWORD:
+                self.var_keyword = name
+        # arity bounds: every parameter without a default must be supplied 
+        # either positionally or by keyword, and without *args no more 
+        # positional arguments than positional parameters may be supplied
+        self.required_count = sum(
+            1 for name, kind in self.parameters
+            if name not in self.defaults 
+            and kind not in (_VAR_POSITIONAL, _VAR_KEYWORD))
+        if self.var_positional is None:
+            self.max_positional_count = len(self.positional_names)
+        else:
+            self.max_positional_count = None
+
+    def bind(self, positional_arguments, keyword_arguments):
+        """ Returns a dict mapping parameter names to arguments (as in 
+            inspect.BoundArguments.arguments), or None if the arguments 
+            can't be bound to the signature.
+        """
+        positional_count = len(positional_arguments)
+        # fast arity checks
+        max_positional_count = self.max_positional_count
+        if (max_positional_count is not None and 
+                positional_count > max_positional_count):
+            return None
+        if positional_count + len(keyword_arguments) < self.required_count:
+            return None
+        # bind positional arguments
+        positional_names = self.positional_names
+        if positional_count > len(positional_names):
+            bound_names = positional_names
+        else:
+            bound_names = positional_names[:positional_count]
+        arguments = dict(zip(bound_names, positional_arguments))
+        if positional_count > len(positional_names):
+            arguments[self.var_positional] = tuple(
+                positional_arguments[len(positional_names):])
+        # bind keyword arguments against the remaining parameters
+        unused_keywords = set(keyword_arguments)
+        for name in bound_names:
+            if name in unused_keywords:
+                if name not in self.positional_only_names:
+                    # multiple values for argument
+                    return None
+        for name, kind in self.parameters:
+            if name in arguments or kind in (_VAR_POSITIONAL, _VAR_KEYWORD):
+                continue
+            if name in keyword_arguments:
+                if kind == _POSITIONAL_ONLY:
+                    return None
+                arguments[name] = keyword_arguments[name]
+                unused_keywords.discard(name)
+            elif name not in self.defaults:
+                # missing a required argument
+                return None
+        if unused_keywords:
+            if self.var_keyword is None:
+                return None
+            arguments[self.var_keyword] = dict(
+                (name, value) for name, value in keyword_arguments.items()
+                if name in unused_keywords)
+        return arguments
+
+    def split(self, arguments):
+        """ Returns the (args, kwargs) that a call with the bound arguments 
+            would use (as in inspect.BoundArguments.args and .kwargs).
+        """
+        args = []
+        kwargs = {}
+        kwargs_started = False
+        for name, kind in self.parameters:
+            if not kwargs_started:
+                if kind in (_VAR_KEYWORD, _KEYWORD_ONLY):
+                    kwargs_started = True
+                elif name not in arguments:
+                    kwargs_started = True
+                    continue
+                elif kind == _VAR_POSITIONAL:
+                    args.extend(arguments[name])
+                    continue
+                else:
+                    args.append(arguments[name])
+                    continue
+            if name in arguments:
+                if kind == _VAR_KEYWORD:
+                    kwargs.update(arguments[name])
+                else:
+                    kwargs[name] = arguments[name]
+        return tuple(args), kwargs
+
+    def __repr__(self):
+        return 'HandlerSignature{}'.format(self.signature)
+
+
+class RouteNode:
+    """ A controller compiled for routing.  Holds the child controllers 
+        reachable from the controller (keyed by attribute name) and the 
+        HandlerSignature of the controller's handler for each HTTP method.
+
+        Signatures for the common HTTP methods are computed when the node is 
+        compiled; signatures for any other method are computed on first use 
+        and then remembered.
+
+    >>> class People(controllers.Controller):
+    ...
+    ...     def get(self, person_id=None):
+    ...         pass
+    ...
+    >>> class Root(controllers.Controller):
+    ...
+    ...     people = People
+    ...
+    >>> node = _compile_controller(Root, {})
+    >>> node.children['people'].controller is People
+    True
+    >>> node.children['people'].signature('get')
+    HandlerSignature(self, person_id=None)
+    >>> node.children['people'].signature('options') is None
+    True
+
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.children = {}
+        self.signatures = {}
+
+    def signature(self, http_method):
+        try:
+            return self.signatures[http_method]
+        except KeyError:
+            pass
+        handler = getattr(self.controller, http_method, None)
+        handler_is_method = callable(handler)
+        if handler_is_method:
+            signature = HandlerSignature(handler)
+        else:
+            signature = None
+        self.signatures[http_method] = signature
+        return signature
+
+    def __repr__(self):
+        return 'RouteNode({})'.format(self.controller.__name__)
+
+
+class RouteTrie:
+    """ Segment trie of route prefixes.  Each node of the trie is keyed on 
+        the normalized URL segment and holds the compiled controllers mounted 
+        at that prefix, along with the order in which their routes were 
+        added (so ties between equally good matches are broken exactly as 
+        they would be when iterating over the routes dictionary).
+
+    >>> class People(controllers.Controller):
+    ...     pass
+    ...
+    >>> trie = compile_routes({'/': People, '/api/people': People})
+    >>> [(order, depth, node) for order, depth, node 
+    ...  in trie.lookup(utilities.Url('/api/people/brianjpetersen'))]
+    [(0, 0, RouteNode(People)), (1, 2, RouteNode(People))]
+    >>> trie.lookup(utilities.Url('/api/scans'))
+    [(0, 0, RouteNode(People))]
+
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.controllers = []
+
+    def insert(self, route, node, order):
+        trie = self
+        for normalized in route.normalized_segments:
+            if normalized not in trie.children:
+                trie.children[normalized] = RouteTrie()
+            trie = trie.children[normalized]
+        trie.controllers.append((order, node))
+
+    def lookup(self, url):
+        """ Returns (order, depth, node) for every controller mounted at a 
+            prefix of the URL, sorted on the order the routes were added.
+        """
+        mounted = [(order, 0, node) for order, node in self.controllers]
+        trie = self
+        for depth, normalized in enumerate(url.normalized_segments, 1):
+            trie = trie.children.get(normalized)
+            if trie is None:
+                break
+            mounted.extend((order, depth, node) 
+                           for order, node in trie.controllers)
+        mounted.sort(key=_extract_mounted_order)
+        return mounted
+
+
+def _extract_mounted_order(mounted):
+    order, _, _ = mounted
+    return order
+
+
+def _compile_controller(controller, nodes):
+    """ Compiles the controller and, recursively, all of its child 
+        controllers into RouteNode objects.  The nodes dict maps controller 
+        classes to their compiled nodes; it is shared across the recursion 
+        so each controller is compiled once, even if it is reachable through 
+        more than one parent (or through itself).
+    """
+    try:
+        return nodes[controller]
+    except KeyError:
+        pass
+    node = nodes[controller] = RouteNode(controller)
+    for http_method in _HTTP_METHODS:
+        node.signature(http_method)
+    for name in dir(controller):
+        attribute = getattr(controller, name, None)
+        attribute_is_controller = (isinstance(attribute, type) and
+                                   issubclass(attribute, controllers.Controller))
+        if attribute_is_controller:
+            node.children[name] = _compile_controller(attribute, nodes)
+    return node
+
+
+def compile_routes(routes):
+    """ Compiles a routes dictionary (mapping route prefixes to controllers) 
+        into a RouteTrie, which match accepts in place of the dictionary.  
+        Compiling walks the controller tree once so that matching a URL 
+        needs only dictionary lookups rather than introspection.
+    """
+    trie = RouteTrie()
+    nodes = {}
+    for order, (route, controller) in enumerate(routes.items()):
+        # because this method is general, we shouldn't assume the route will
+        # come in as type utilities.URL; casting here as appropriate
+        if not isinstance(route, utilities.Url):
+            route = utilities.Url(route)
+        trie.insert(route, _compile_controller(controller, nodes), order)
+    return trie
+
+
 def _match_controller(controller, url, http_method,
                       previously_matched_depth=0,
                       previously_matched_arguments=None):
@@ -17,7 +316,8 @@ def _match_controller(controller, url, http_method,
         general match function defined below and from itself, recursively.
         It takes as input a URL (assumed to be a utilities.Url object) and 
         attempts to match this URL against a controller object (which is a 
-        subclass of controller.Controller).  
+        subclass of controller.Controller, or the RouteNode compiled from 
+        one).  
 
         First, the controller object is introspected to determine if it has 
         an attribute named http_method.  If it does have an attribute named 
@@ -148,122 +448,90 @@ def _match_controller(controller, url, http_method,
 
     """
     # pre-process arguments
+    if isinstance(controller, RouteNode):
+        node = controller
+    else:
+        node = _compile_controller(controller, {})
+    controller = node.controller
     if previously_matched_arguments is None:
         previously_matched_arguments = {}
+    segments = url.segments
+    normalized_segments = url.normalized_segments
     # define return list
     matches = []
     # does the supplied controller have a child (which is a subclass of 
     # controllers.Controller) that matches the first element of the URL?
     # if so, recurse
-    url_has_depth = len(url) > 0
+    url_has_depth = len(segments) > 0
     if url_has_depth:
-        url_segment = url[0]
-        url_attribute = getattr(controller, url_segment.normalized, type(None))
-        attribute_is_controller = issubclass(url_attribute,
-                                             controllers.Controller)
-        if attribute_is_controller:
-            potential_controller = url_attribute
+        potential_controller = node.children.get(normalized_segments[0])
+        if potential_controller is not None:
             branched_matches = _match_controller(potential_controller, 
                                                  url[1:], http_method,
                                                  (previously_matched_depth + 1), 
                                                  previously_matched_arguments)
             matches.extend(branched_matches)
-    # does controller have a method matching the HTTP method? if so, extract method 
-    # signature details and attempt to match the URL against the method
-    handler = getattr(controller, http_method, None)
-    handler_is_method = callable(handler)
-    if handler_is_method:
-        method_handler = handler
-        # extract method signature details
-        method_signature = inspect.signature(method_handler)
+    # does controller have a method matching the HTTP method? if so, use the 
+    # precomputed signature details to attempt to match the URL against it
+    handler_signature = node.signature(http_method)
+    if handler_signature is not None:
         # attempt to match the the entirety of the URL against the method 
-        # handler's signature
-        try:
-            # skipping the first method argument, which is self and is
-            # implicitly matched to the controller class; adding it here
-            # and deleting it from the returned bound arguments
-            positional_arguments = ['self', ]
-            positional_arguments.extend([str(u) for u in url])
-            bound_arguments = method_signature.bind(*positional_arguments, 
-                                                    **previously_matched_arguments)
-            # if we delete self, the returned bound arguments no longer match the
-            # signature, and all positional arguments are defined in kwargs;
-            # any wildcard positional arguments are also explicitly defined as 
-            # a kwarg
-            # for example, foo(a, *args) evaluated as foo(1, 2, 3) yields 
-            # kwargs={'a': 1, 'args': (2, 3)}
-            ###### del bound_arguments.arguments['self']
+        # handler's signature, skipping the first method argument, which is 
+        # self and is implicitly matched to the controller class; adding it 
+        # here and dropping it from the returned positional arguments
+        positional_arguments = ('self', ) + segments
+        bound_arguments = handler_signature.bind(positional_arguments, 
+                                                 previously_matched_arguments)
+        if bound_arguments is not None:
             # we seek first to maximize the match depth, then to minimize the 
             # number of unmatched wildcard arguments.  at this stage of the 
             # matching process, the match depth is the same as the controller 
             # passed as input to this function
-            unmatched_wildcard_arguments = 0
-            for argument in bound_arguments.signature.parameters.values():
-                argument_is_wildcard_positional = (argument.kind ==
-                                                   argument.VAR_POSITIONAL)
-                argument_is_bound = (argument.name in bound_arguments.arguments)
-                if argument_is_bound and argument_is_wildcard_positional:
-                    unmatched_wildcard_arguments = len(bound_arguments.arguments[argument.name])
-                    break
+            var_positional = handler_signature.var_positional
+            if var_positional in bound_arguments:
+                unmatched_wildcard_arguments = len(bound_arguments[var_positional])
+            else:
+                unmatched_wildcard_arguments = 0
+            args, kwargs = handler_signature.split(bound_arguments)
             matches.append((previously_matched_depth,
                             unmatched_wildcard_arguments, controller,
-                            bound_arguments.args[1:], bound_arguments.kwargs))
-        except TypeError:
-            pass
+                            args[1:], kwargs))
         # incrementally attempt to match the URL against controller attributes
-        for url_position, url_segment in enumerate(url):
-            url_attribute = getattr(controller, url_segment.normalized,
-                                    type(None))
-            attribute_is_controller = issubclass(url_attribute,
-                                                 controllers.Controller)
-            if attribute_is_controller:
+        for url_position, normalized in enumerate(normalized_segments):
+            potential_controller = node.children.get(normalized)
+            if potential_controller is not None:
                 # if the url up to this controller match also matches the 
                 # method signature, branch and recurse
-                potential_controller = url_attribute
-                # see comments above related to skipping the first method 
-                # argument and how deleting self after the match results 
-                # in all arguments (even wildcard positionals) being defined 
-                # as kwargs
-                positional_arguments = ['self', ]
-                positional_arguments.extend([str(u)
-                                             for u in url[:url_position]])
-                try:
-                    bound_arguments = method_signature.bind(
-                        *positional_arguments, **previously_matched_arguments)
-                except TypeError:
+                positional_arguments = ('self', ) + segments[:url_position]
+                bound_arguments = handler_signature.bind(
+                    positional_arguments, previously_matched_arguments)
+                if bound_arguments is None:
                     continue
-                del bound_arguments.arguments['self']
-                # extract relevant data so previously_matched_arguments can 
-                # be correctly set for the next branch
-                for argument in bound_arguments.signature.parameters.values():
-                    # bound_arguments doesn't include default arguments, but 
-                    # we need to pass them as previously_matched_arguments 
-                    # when we recurse and branch
-                    argument_not_bound = (argument.name not in
-                                          bound_arguments.arguments)
-                    argument_has_default = (argument.default is not
-                                            argument.empty)
-                    if argument_not_bound and argument_has_default:
-                        name = argument.name
-                        default = argument.default
-                        bound_arguments.arguments[name] = default
-                    # if any wildcard positional arguments have been matched, 
-                    # then this controller is actually not a potential match 
-                    # because it is ambiguous how the URL segments consumed 
-                    # to fill *args should be marshalled to the next 
-                    # potential handler as previously_matched_arguments 
-                    # because once *args has been bound, binding adding 
-                    # additional arguments to the cannot cause it to be 
-                    # unbound, we are able to break out at this point
-                    argument_is_wildcard_positional = (argument.kind ==
-                                                       argument.VAR_POSITIONAL)
-                    argument_is_bound = (argument.name in
-                                         bound_arguments.arguments)
-                    if argument_is_bound and argument_is_wildcard_positional:
-                        return matches
+                # if we delete self, the bound arguments no longer match the
+                # signature, and all positional arguments are split out as 
+                # kwargs; for example, foo(self, a, b=2) evaluated as 
+                # foo(self, 1) yields kwargs={'a': 1, 'b': 2}
+                bound_arguments.pop('self', None)
+                # bound_arguments doesn't include default arguments, but we 
+                # need to pass them as previously_matched_arguments when we 
+                # recurse and branch
+                for name, default in handler_signature.defaults.items():
+                    if name not in bound_arguments:
+                        bound_arguments[name] = default
+                # if any wildcard positional arguments have been matched, 
+                # then this controller is actually not a potential match 
+                # because it is ambiguous how the URL segments consumed 
+                # to fill *args should be marshalled to the next 
+                # potential handler as previously_matched_arguments 
+                # because once *args has been bound, binding additional 
+                # arguments cannot cause it to be unbound, we are able to 
+                # stop looking for branches at this point
+                if handler_signature.var_positional in bound_arguments:
+                    return matches
+                _, bound_keyword_arguments = handler_signature.split(
+                    bound_arguments)
                 newly_matched_arguments = previously_matched_arguments.copy()
-                newly_matched_arguments.update(bound_arguments.kwargs)
-                # add arguments with defaults to previously_matched_arguments
+                newly_matched_arguments.update(bound_keyword_arguments)
                 branched_matches = _match_controller(
                     potential_controller, url[(url_position + 1):],
                     http_method, (previously_matched_depth + 1),
@@ -288,7 +556,10 @@ def _extract_matches_sort_invariant(match):
 
 def match(routes, url, method):
     """ Returns the best matching controller (and matched arguments to 
-        the handler method) to the supplied URL.
+        the handler method) to the supplied URL.  The routes may be given 
+        either as a dictionary mapping route prefixes to controllers or as a 
+        RouteTrie already compiled from one by compile_routes; the former is 
+        compiled on every call, so long-lived callers should pass the latter.
 
     >>> class Scans(controllers.Controller):
     ...
@@ -340,22 +611,16 @@ def match(routes, url, method):
     method = method.lower()
     if not isinstance(url, utilities.Url):
         url = utilities.Url(url)
-    # iterate over the routes dictionary, recursively looking in the parent 
-    # controller for matches
+    if not isinstance(routes, RouteTrie):
+        routes = compile_routes(routes)
+    # iterate over the controllers mounted at prefixes of the URL, 
+    # recursively looking in the parent controller for matches
     matches = []
-    for route, controller in routes.items():
-        # because this method is general, we shouldn't assume the URL will
-        # come in as type utilities.URL; casting here as appropriate
-        if not isinstance(route, utilities.Url):
-            route = utilities.Url(route)
-        route_matches_url = url.starts_with(route)
-        if route_matches_url:
-            match_depth = len(route)
-            unmatched_url = url[match_depth:]
-            # attempt matches against the root controller
-            match = _match_controller(controller, unmatched_url, method,
-                                      match_depth)
-            matches.extend(match)
+    for _, match_depth, node in routes.lookup(url):
+        unmatched_url = url[match_depth:]
+        # attempt matches against the root controller
+        match = _match_controller(node, unmatched_url, method, match_depth)
+        matches.extend(match)
     if matches:
         best_match = max(matches, key=_extract_matches_sort_invariant)
         _, _, controller, args, kwargs = best_match
@@ -364,6 +629,85 @@ def match(routes, url, method):
         return None, (), {}
 
 
+class MatchCache:
+    """ Bounded LRU memoization of match results keyed on (method, path); 
+        Application keys it on the normalized path segments.
+
+        Because paths containing identifiers (eg, /people/<id>) are of high 
+        cardinality, a path is only admitted to the cache once it has been 
+        missed twice; paths seen only once are remembered in a doorkeeper 
+        set (itself bounded by max_size and reset when full) and can't evict 
+        the hot entries.  Set doorkeeper to False to admit on first miss.
+
+    >>> cache = MatchCache(max_size=2)
+    >>> cache.get(('get', '/a')) is None
+    True
+    >>> cache.put(('get', '/a'), ('A', (), {}))
+    >>> cache.get(('get', '/a')) is None
+    True
+    >>> cache.put(('get', '/a'), ('A', (), {}))
+    >>> cache.get(('get', '/a'))
+    ('A', (), {})
+    >>> cache = MatchCache(max_size=2, doorkeeper=False)
+    >>> for path in ('/a', '/b', '/c'):
+    ...     cache.put(('get', path), (path, (), {}))
+    >>> cache.get(('get', '/a')) is None
+    True
+    >>> cache.statistics == {'size': 2, 'hits': 0, 'misses': 1, 
+    ...                      'evictions': 1}
+    True
+
+    """
+
+    def __init__(self, max_size=4096, doorkeeper=True):
+        self.max_size = max_size
+        self.doorkeeper = doorkeeper
+        self.entries = collections.OrderedDict()
+        self.candidates = set()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            try:
+                match = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return match
+
+    def put(self, key, match):
+        with self.lock:
+            if self.doorkeeper and key not in self.candidates:
+                if len(self.candidates) >= self.max_size:
+                    self.candidates.clear()
+                self.candidates.add(key)
+                return
+            self.candidates.discard(key)
+            self.entries[key] = match
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.candidates.clear()
+
+    @property
+    def statistics(self):
+        return {'size': len(self.entries), 'hits': self.hits, 
+                'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self.entries)
+
+
 if __name__ == '__main__':
 
     import doctest
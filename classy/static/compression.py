@@ -0,0 +1,64 @@
+# standard libraries
+import zlib
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('accepts_gzip', 'gzip_compress', 'GZIP_TYPES')
+
+
+# text-like content types that are worth compressing
+GZIP_TYPES = frozenset(('text/html', 'text/css', 'text/plain', 'text/csv',
+                        'text/xml', 'text/javascript', 'text/markdown',
+                        'application/javascript', 'application/json',
+                        'application/xml', 'application/xhtml+xml',
+                        'application/rss+xml', 'application/atom+xml',
+                        'application/wasm', 'image/svg+xml', 'image/x-icon',
+                        'font/ttf', 'font/otf'))
+
+
+def accepts_gzip(accept_encoding):
+    """ Returns True if an Accept-Encoding header (RFC 7231, section 5.3.4)
+        allows a gzip content coding.
+
+    >>> accepts_gzip('gzip, deflate, br'), accepts_gzip('deflate')
+    (True, False)
+    >>> accepts_gzip('gzip;q=0, *'), accepts_gzip('*;q=0.5')
+    (False, True)
+    >>> accepts_gzip(None), accepts_gzip('x-gzip')
+    (False, True)
+
+    """
+    if not accept_encoding:
+        return False
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, parameters = coding.partition(';')
+        quality = 1.0
+        for parameter in parameters.split(';'):
+            key, _, value = parameter.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    for name in ('gzip', 'x-gzip'):
+        if name in qualities:
+            return qualities[name] > 0
+    return qualities.get('*', 0) > 0
+
+
+def gzip_compress(data, level=6):
+    """ Compresses bytes into a gzip member; the output is deterministic
+        (no timestamp or filename is written into the header).
+
+    >>> import gzip
+    >>> gzip.decompress(gzip_compress(b'spam' * 100)) == b'spam' * 100
+    True
+
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
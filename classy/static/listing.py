@@ -0,0 +1,326 @@
+# standard libraries
+import os
+import html
+import json
+import time
+import threading
+import collections
+import urllib.parse
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('ListingCache', 'Entry', 'scan', 'sort_entries', 'render_html',
+           'render_json', 'SORT_KEYS')
+
+
+Entry = collections.namedtuple('Entry', ('name', 'is_directory', 'size',
+                                         'modified'))
+
+# directories are listed before files under every sort
+SORT_KEYS = {
+    'name': lambda entry: (not entry.is_directory, entry.name),
+    'size': lambda entry: (not entry.is_directory, entry.size or 0,
+                           entry.name),
+    'modified': lambda entry: (not entry.is_directory, entry.modified,
+                               entry.name),
+}
+# rendered rows are joined into chunks of this many before being sent
+ROWS_PER_CHUNK = 256
+
+
+def scan(path, hidden=False):
+    """ Returns an Entry for everything in a directory, using os.scandir;
+        names starting with a dot are skipped unless hidden is True.
+        Entries that disappear while the directory is scanned are left out.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as path:
+    ...     os.mkdir(os.path.join(path, 'images'))
+    ...     with open(os.path.join(path, 'index.html'), 'wb') as file:
+    ...         _ = file.write(b'<html></html>')
+    ...     with open(os.path.join(path, '.secret'), 'wb') as file:
+    ...         pass
+    ...     [(e.name, e.is_directory, e.size)
+    ...      for e in sort_entries(scan(path), 'name')]
+    [('images', True, None), ('index.html', False, 13)]
+
+    """
+    entries = []
+    with os.scandir(path) as iterator:
+        for directory_entry in iterator:
+            name = directory_entry.name
+            if not hidden and name.startswith('.'):
+                continue
+            try:
+                is_directory = directory_entry.is_dir()
+                stat = directory_entry.stat()
+            except (IOError, OSError):
+                continue
+            size = None if is_directory else stat.st_size
+            entries.append(Entry(name, is_directory, size, stat.st_mtime))
+    return entries
+
+
+def sort_entries(entries, sort='name', reverse=False):
+    """ Sorts entries by one of SORT_KEYS, keeping directories first. """
+    entries = sorted(entries, key=SORT_KEYS[sort], reverse=reverse)
+    if reverse:
+        # reversing would put the directories last
+        directories = [entry for entry in entries if entry.is_directory]
+        files = [entry for entry in entries if not entry.is_directory]
+        entries = directories + files
+    return entries
+
+
+def _query(sort, reverse, page, per_page):
+    return '?' + urllib.parse.urlencode({
+        'sort': sort, 'order': 'desc' if reverse else 'asc', 'page': page,
+        'per_page': per_page})
+
+
+def render_html(url, entries, sort, reverse, page, pages, per_page, total):
+    """ Generates a page of a listing as HTML, in chunks of encoded rows;
+        url is the directory's (with a trailing slash), which entries are
+        linked relative to.
+
+    >>> entries = [Entry('a&b', True, None, 0.0),
+    ...            Entry('c.txt', False, 3, 0.0)]
+    >>> page = b''.join(render_html('/files/', entries, 'name', False, 1, 1,
+    ...                             100, 2)).decode('utf-8')
+    >>> '<a href="/files/a%26b/">a&amp;b/</a>' in page
+    True
+    >>> '<td>3</td>' in page
+    True
+
+    """
+    escaped_url = html.escape(url)
+    yield ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+           '<title>Index of {0}</title>\n</head>\n<body>\n'
+           '<h1>Index of {0}</h1>\n<table>\n<thead><tr>'.format(escaped_url)
+           ).encode('utf-8')
+    headings = []
+    for column in ('name', 'size', 'modified'):
+        column_reverse = not reverse if column == sort else False
+        headings.append('<th><a href="{}">{}</a></th>'.format(
+            html.escape(_query(column, column_reverse, 1, per_page)),
+            column.capitalize()))
+    yield ''.join(headings).encode('utf-8') + b'</tr></thead>\n<tbody>\n'
+    if url != '/':
+        yield b'<tr><td><a href="../">../</a></td><td></td><td></td></tr>\n'
+    quoted_url = urllib.parse.quote(url)
+    for start in range(0, len(entries), ROWS_PER_CHUNK):
+        rows = []
+        for entry in entries[start:(start + ROWS_PER_CHUNK)]:
+            suffix = '/' if entry.is_directory else ''
+            quoted_name = urllib.parse.quote(entry.name) + suffix
+            size = '' if entry.size is None else entry.size
+            rows.append('<tr><td><a href="{}{}">{}</a></td><td>{}</td>'
+                        '<td>{}</td></tr>\n'.format(
+                            quoted_url, quoted_name,
+                            html.escape(entry.name) + suffix, size,
+                            _format_time(entry.modified)))
+        yield ''.join(rows).encode('utf-8')
+    links = []
+    if page > 1:
+        links.append('<a rel="prev" href="{}">Previous</a>'.format(
+            html.escape(_query(sort, reverse, page - 1, per_page))))
+    if page < pages:
+        links.append('<a rel="next" href="{}">Next</a>'.format(
+            html.escape(_query(sort, reverse, page + 1, per_page))))
+    yield ('</tbody>\n</table>\n<p>{} entries, page {} of {} {}</p>\n'
+           '</body>\n</html>\n'.format(total, page, pages, ' '.join(links))
+           ).encode('utf-8')
+
+
+def render_json(url, entries, sort, reverse, page, pages, per_page, total):
+    """ Generates a page of a listing as a JSON object, in chunks of encoded
+        entries.
+
+    >>> entries = [Entry('a', True, None, 0.0), Entry('b', False, 3, 1.5)]
+    >>> page = b''.join(render_json('/files/', entries, 'name', False, 1, 1,
+    ...                             100, 2))
+    >>> listing = json.loads(page.decode('utf-8'))
+    >>> listing['total'], listing['entries'][1]
+    (2, {'name': 'b', 'type': 'file', 'size': 3, 'modified': 1.5})
+
+    """
+    yield ('{{"path": {}, "sort": {}, "order": {}, "page": {}, "pages": {}, '
+           '"per_page": {}, "total": {}, "entries": ['.format(
+               json.dumps(url), json.dumps(sort),
+               '"desc"' if reverse else '"asc"', page, pages, per_page, total)
+           ).encode('utf-8')
+    for start in range(0, len(entries), ROWS_PER_CHUNK):
+        rows = []
+        for entry in entries[start:(start + ROWS_PER_CHUNK)]:
+            rows.append(json.dumps({
+                'name': entry.name,
+                'type': 'directory' if entry.is_directory else 'file',
+                'size': entry.size, 'modified': entry.modified}))
+        separator = ', ' if start > 0 else ''
+        yield (separator + ', '.join(rows)).encode('utf-8')
+    yield b']}'
+
+
+def _format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp))
+
+
+def _stat_key(stat):
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+class _Snapshot:
+
+    def __init__(self, stat_key, entries):
+        self.stat_key = stat_key
+        self.entries = entries
+        self.sorted = {}
+
+
+class ListingCache:
+    """ Caches directory listings: the scanned entries of up to
+        max_directories directories (sorted orders are kept alongside) and
+        rendered pages up to max_bytes in all, least recently used first
+        out.  Everything cached for a directory is dropped when its inode
+        or modification time changes, which happens whenever an entry is
+        added, removed or renamed, so serving a cached page costs a single
+        stat of the directory.  (Sizes and times of files that are modified
+        in place are only refreshed with the directory.)  A directory
+        modified within the last racy_interval seconds isn't cached, as a
+        further change within the file system's timestamp granularity
+        wouldn't be noticed.  The cache is safe to share between
+        controllers and threads.
+
+    >>> import tempfile
+    >>> cache = ListingCache()
+    >>> with tempfile.TemporaryDirectory() as path:
+    ...     os.utime(path, (0, 0))
+    ...     stat = os.stat(path)
+    ...     [e.name for e in cache.entries(path, stat, 'name')]
+    ...     with open(os.path.join(path, 'new.txt'), 'wb') as file:
+    ...         pass
+    ...     pages = cache.collect(path, stat, 'html', [b'<p>', b'</p>'])
+    ...     b''.join(pages), cache.page(path, stat, 'html')
+    ...     stat = os.stat(path)
+    ...     cache.page(path, stat, 'html') is None
+    ...     [e.name for e in cache.entries(path, stat, 'name')]
+    []
+    (b'<p></p>', b'<p></p>')
+    True
+    ['new.txt']
+
+    """
+
+    def __init__(self, max_directories=256, max_bytes=16777216,
+                 max_page_size=1048576, hidden=False, racy_interval=2.0):
+        self.max_directories = max_directories
+        self.max_bytes = max_bytes
+        self.max_page_size = min(max_page_size, max_bytes)
+        self.hidden = hidden
+        self.racy_interval = racy_interval
+        self.snapshots = collections.OrderedDict()
+        self.pages = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.scans = 0
+
+    def entries(self, path, stat, sort='name', reverse=False):
+        """ The entries of a directory in the given order, scanning it only
+            if it has changed since it was last scanned; stat should be
+            taken before the call, so a change during a scan is noticed.
+        """
+        stat_key = _stat_key(stat)
+        with self.lock:
+            snapshot = self.snapshots.get(path, None)
+            if snapshot is not None and snapshot.stat_key == stat_key:
+                self.snapshots.move_to_end(path)
+            else:
+                snapshot = None
+        if snapshot is None:
+            snapshot = _Snapshot(stat_key, scan(path, self.hidden))
+            with self.lock:
+                self.scans += 1
+                if self._is_racy(stat):
+                    self.snapshots.pop(path, None)
+                    return sort_entries(snapshot.entries, sort, reverse)
+                self.snapshots[path] = snapshot
+                self.snapshots.move_to_end(path)
+                while len(self.snapshots) > self.max_directories:
+                    self.snapshots.popitem(last=False)
+        order = (sort, reverse)
+        entries = snapshot.sorted.get(order, None)
+        if entries is None:
+            entries = snapshot.sorted[order] = sort_entries(snapshot.entries,
+                                                            sort, reverse)
+        return entries
+
+    def page(self, path, stat, variant):
+        """ The rendered page cached for a variant (eg, the format, order and
+            page number) of a directory's listing, or None if there isn't
+            one or the directory has changed.
+        """
+        key = (path, variant)
+        with self.lock:
+            cached = self.pages.get(key, None)
+            if cached is None or cached[0] != _stat_key(stat):
+                self.misses += 1
+                return None
+            self.pages.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def collect(self, path, stat, variant, chunks):
+        """ Passes on the chunks of a page as it's rendered, caching the
+            page once it's complete (unless it's larger than max_page_size).
+        """
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_page_size:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is None or self._is_racy(stat):
+            return
+        body = b''.join(parts)
+        key = (path, variant)
+        with self.lock:
+            previous = self.pages.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self.pages[key] = (_stat_key(stat), body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted_body) = self.pages.popitem(last=False)
+                self.size -= len(evicted_body)
+
+    def _is_racy(self, stat):
+        return time.time() - stat.st_mtime < self.racy_interval
+
+    def invalidate(self, path=None):
+        """ Drops a directory's entries and pages, or everything if no path
+            is given.
+        """
+        with self.lock:
+            if path is None:
+                self.snapshots.clear()
+                self.pages.clear()
+                self.size = 0
+                return
+            self.snapshots.pop(path, None)
+            for key in [key for key in self.pages if key[0] == path]:
+                self.size -= len(self.pages.pop(key)[1])
+
+    @property
+    def statistics(self):
+        return {'directories': len(self.snapshots), 'pages': len(self.pages),
+                'size': self.size, 'hits': self.hits, 'misses': self.misses,
+                'scans': self.scans}
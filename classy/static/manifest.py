@@ -0,0 +1,285 @@
+""" Content-hashed (fingerprinted) names for the files under a directory.
+
+    Build a manifest ahead of deployment with:
+
+        python -m classy.static.manifest PATH [--output FILENAME]
+"""
+# standard libraries
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+import urllib.parse
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('Manifest', 'fingerprint', 'file_digest', 'MANIFEST_FILENAME')
+
+
+# where a manifest is saved by default, under the directory it describes
+MANIFEST_FILENAME = '.manifest.json'
+
+
+def fingerprint(name, digest):
+    """ Inserts a digest into a file name, before its extension.
+
+    >>> fingerprint('js/app.js', '3f9a1c'), fingerprint('LICENSE', '3f9a1c')
+    ('js/app.3f9a1c.js', 'LICENSE.3f9a1c')
+    >>> fingerprint('css/site.min.css', '3f9a1c')
+    'css/site.min.3f9a1c.css'
+
+    """
+    directory, _, basename = name.rpartition('/')
+    stem, _, extension = basename.rpartition('.')
+    if not stem:
+        basename = '{}.{}'.format(basename, digest)
+    else:
+        basename = '{}.{}.{}'.format(stem, digest, extension)
+    return directory + '/' + basename if directory else basename
+
+
+def file_digest(filename, algorithm='sha256', block_size=1048576):
+    """ The hex digest of a file's contents, read in blocks. """
+    digest = hashlib.new(algorithm)
+    with open(filename, 'rb') as file:
+        data = file.read(block_size)
+        while data:
+            digest.update(data)
+            data = file.read(block_size)
+    return digest.hexdigest()
+
+
+def _stat_key(stat):
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class Manifest:
+    """ Maps the files under path (their names relative to it, with / as
+        separator; hidden files are skipped) to fingerprinted names that
+        carry a prefix of the hash of their contents, eg app.js to
+        app.3f9a1c2e.js.  Since a fingerprinted name always refers to the
+        same content, it can be cached by clients indefinitely.
+
+        prepare() loads the manifest saved at filename (by default
+        MANIFEST_FILENAME under path), re-hashes only the files whose
+        inode, size or modification time have changed since, and saves it
+        again if anything did, so large trees aren't re-hashed on every
+        start.  url(name) resolves a logical name to its fingerprinted URL
+        (under url_prefix) and resolve(fingerprinted_name) does the
+        reverse, re-checking the file at most once every stat_interval
+        seconds so that a stale fingerprint is never served with new
+        content.
+
+    >>> with tempfile.TemporaryDirectory() as path:
+    ...     os.mkdir(os.path.join(path, 'js'))
+    ...     with open(os.path.join(path, 'js', 'app.js'), 'wb') as file:
+    ...         _ = file.write(b'alert(1);')
+    ...     manifest = Manifest(path, url_prefix='/static/', stat_interval=0)
+    ...     manifest.url('js/app.js'), manifest.url('js/missing.js')
+    ...     manifest.resolve('js/app.e63170ac.js')
+    ...     Manifest(path).prepare()
+    ...     with open(os.path.join(path, 'js', 'app.js'), 'wb') as file:
+    ...         _ = file.write(b'alert(2);')
+    ...     manifest.resolve('js/app.e63170ac.js') is None
+    ('/static/js/app.e63170ac.js', '/static/js/missing.js')
+    'js/app.js'
+    0
+    True
+
+    """
+
+    def __init__(self, path, filename=None, url_prefix='', hash_length=8,
+                 algorithm='sha256', stat_interval=1.0):
+        self.path = os.path.abspath(path)
+        if filename is None:
+            filename = os.path.join(self.path, MANIFEST_FILENAME)
+        self.filename = filename
+        self.url_prefix = url_prefix
+        self.hash_length = hash_length
+        self.algorithm = algorithm
+        self.stat_interval = stat_interval
+        # name: [digest, stat key, checked at]
+        self.files = {}
+        self.fingerprinted_names = {}
+        self.logical_names = {}
+        self.prepared = False
+        self.lock = threading.RLock()
+
+    def prepare(self):
+        """ Loads the saved manifest, brings it up to date with the files
+            under path and saves it if it changed.  Returns the number of
+            files hashed.
+        """
+        with self.lock:
+            self.load()
+            hashed = self.update()
+            if hashed or not os.path.exists(self.filename):
+                self.save()
+            return hashed
+
+    def load(self):
+        """ Reads the saved manifest, if there is one made with the same
+            algorithm; its entries are trusted until update() checks them.
+        """
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+        except (IOError, OSError, ValueError):
+            return
+        if saved.get('algorithm', None) != self.algorithm:
+            return
+        with self.lock:
+            self.files = {name: [digest, tuple(stat_key), 0.0]
+                          for name, (digest, stat_key)
+                          in saved.get('files', {}).items()}
+            self._index()
+
+    def update(self):
+        """ Re-hashes new and changed files under path and forgets removed
+            ones.  Returns the number of files hashed.
+        """
+        files = {}
+        hashed = 0
+        now = time.monotonic()
+        for name, filename in self._walk():
+            try:
+                stat = os.stat(filename)
+            except (IOError, OSError):
+                continue
+            entry = self.files.get(name, None)
+            if entry is None or entry[1] != _stat_key(stat):
+                entry = self._hash(filename, stat)
+                if entry is None:
+                    continue
+                hashed += 1
+            entry[2] = now
+            files[name] = entry
+        with self.lock:
+            self.files = files
+            self._index()
+            self.prepared = True
+        return hashed
+
+    def save(self):
+        """ Writes the manifest to filename, atomically replacing it. """
+        with self.lock:
+            saved = {'algorithm': self.algorithm,
+                     'files': {name: [digest, list(stat_key)]
+                               for name, (digest, stat_key, _)
+                               in sorted(self.files.items())}}
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        file = tempfile.NamedTemporaryFile('w', dir=directory,
+                                           prefix='.manifest-', delete=False,
+                                           encoding='utf-8')
+        try:
+            with file:
+                json.dump(saved, file, indent=1)
+            os.replace(file.name, self.filename)
+        except BaseException:
+            os.unlink(file.name)
+            raise
+
+    def url(self, name):
+        """ The fingerprinted URL for a logical name; names that aren't in
+            the manifest are left as they are.
+        """
+        if not self.prepared:
+            self.prepare()
+        fingerprinted_name = self.fingerprinted_names.get(name, name)
+        return self.url_prefix + urllib.parse.quote(fingerprinted_name)
+
+    def resolve(self, fingerprinted_name):
+        """ The logical name for a fingerprinted name, or None if it isn't
+            one or no longer matches the file's contents.
+        """
+        if not self.prepared:
+            self.prepare()
+        name = self.logical_names.get(fingerprinted_name, None)
+        if name is None:
+            return None
+        entry = self.files.get(name, None)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry[2] >= self.stat_interval:
+            filename = os.path.join(self.path, *name.split('/'))
+            try:
+                stat = os.stat(filename)
+            except (IOError, OSError):
+                stat = None
+            if stat is None or _stat_key(stat) != entry[1]:
+                self._refresh(name, filename, stat)
+                if self.logical_names.get(fingerprinted_name, None) != name:
+                    return None
+            else:
+                entry[2] = now
+        return name
+
+    def _refresh(self, name, filename, stat):
+        entry = None if stat is None else self._hash(filename, stat)
+        with self.lock:
+            if entry is None:
+                self.files.pop(name, None)
+            else:
+                entry[2] = time.monotonic()
+                self.files[name] = entry
+            self._index()
+
+    def _hash(self, filename, stat):
+        try:
+            digest = file_digest(filename, self.algorithm)
+        except (IOError, OSError):
+            return None
+        return [digest, _stat_key(stat), 0.0]
+
+    def _index(self):
+        fingerprinted_names = {}
+        for name, (digest, _, _) in self.files.items():
+            fingerprinted_names[name] = fingerprint(
+                name, digest[:self.hash_length])
+        self.fingerprinted_names = fingerprinted_names
+        self.logical_names = {fingerprinted_name: name
+                              for name, fingerprinted_name
+                              in fingerprinted_names.items()}
+
+    def _walk(self):
+        for directory, directory_names, filenames in os.walk(self.path):
+            directory_names[:] = [directory_name
+                                  for directory_name in directory_names
+                                  if not directory_name.startswith('.')]
+            relative_directory = os.path.relpath(directory, self.path)
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                if relative_directory == '.':
+                    name = filename
+                else:
+                    name = '/'.join(relative_directory.split(os.sep) +
+                                    [filename])
+                yield name, os.path.join(directory, filename)
+
+    def __len__(self):
+        return len(self.files)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('--output', default=None,
+                        help='where to save the manifest (default: {} under '
+                             'path)'.format(MANIFEST_FILENAME))
+    parser.add_argument('--hash-length', type=int, default=8)
+    arguments = parser.parse_args()
+    manifest = Manifest(arguments.path, arguments.output,
+                        hash_length=arguments.hash_length)
+    hashed = manifest.prepare()
+    print('{} files, {} hashed, saved to {}'.format(len(manifest), hashed,
+                                                   manifest.filename),
+          file=sys.stderr)
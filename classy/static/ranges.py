@@ -0,0 +1,179 @@
+# standard libraries
+import os
+import email.utils
+# third party libraries
+pass
+# first party libraries
+pass
+
+
+__all__ = ('parse_range', 'if_range_matches', 'RangeFileIterator',
+           'MultipartByteRangesIterator')
+
+
+def parse_range(header, content_length, max_ranges=16):
+    """ Parses the value of a Range header (RFC 7233) against a
+        representation of content_length bytes.  Returns a list of
+        (start, stop) byte offsets (stop is exclusive) for the satisfiable
+        ranges, in the order requested; an empty list if no range is
+        satisfiable; or None if the header should be ignored because it is
+        malformed, isn't in bytes or asks for more than max_ranges ranges.
+
+    >>> parse_range('bytes=0-499', 1000)
+    [(0, 500)]
+    >>> parse_range('bytes=500-, -100', 1000)
+    [(500, 1000), (900, 1000)]
+    >>> parse_range('bytes=900-2000', 1000)
+    [(900, 1000)]
+    >>> parse_range('bytes=1000-, -0', 1000)
+    []
+    >>> parse_range('bytes=500-400', 1000) is None
+    True
+    >>> parse_range('items=0-1', 1000) is None
+    True
+    >>> parse_range('bytes=0-0,2-2,4-4', 1000, max_ranges=2) is None
+    True
+
+    """
+    unit, _, range_set = header.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+    range_specs = [r.strip() for r in range_set.split(',') if r.strip()]
+    if not range_specs or len(range_specs) > max_ranges:
+        return None
+    ranges = []
+    for range_spec in range_specs:
+        first, dash, last = range_spec.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash or not (first.isdigit() or first == '') or \
+                not (last.isdigit() or last == '') or first == last == '':
+            return None
+        if first == '':
+            # suffix range: the final bytes of the representation
+            suffix_length = int(last)
+            if suffix_length == 0 or content_length == 0:
+                continue
+            start = max(content_length - suffix_length, 0)
+            stop = content_length
+        else:
+            start = int(first)
+            if last == '':
+                stop = content_length
+            elif int(last) < start:
+                return None
+            else:
+                stop = min(int(last) + 1, content_length)
+            if start >= content_length:
+                continue
+        ranges.append((start, stop))
+    return ranges
+
+
+def if_range_matches(request, etag, last_modified):
+    """ Evaluates an If-Range precondition: a Range header is only honored
+        if If-Range is absent or names the current representation, either
+        by strong entity tag or by exact modification date.
+
+    >>> import webob
+    >>> request = webob.Request.blank('/', headers={'If-Range': '"a"'})
+    >>> if_range_matches(request, '"a"', 0), if_range_matches(request,
+    ...                                                        '"b"', 0)
+    (True, False)
+    >>> request.headers['If-Range'] = 'W/"a"'
+    >>> if_range_matches(request, 'W/"a"', 0)
+    False
+    >>> request.headers['If-Range'] = 'Wed, 17 Jun 2015 00:13:20 GMT'
+    >>> if_range_matches(request, '"a"', 1434500000.5)
+    True
+
+    """
+    if_range = request.headers.get('If-Range', None)
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # strong comparison; weak entity tags never match
+        return not etag.startswith('W/') and if_range == etag
+    parsed_date = email.utils.parsedate_tz(if_range)
+    if parsed_date is None:
+        return False
+    return email.utils.mktime_tz(parsed_date) == int(last_modified)
+
+
+class RangeFileIterator:
+    """ Iterates over the bytes [start, stop) of an open file, seeking
+        directly to start rather than reading through the file.
+    """
+
+    def __init__(self, file, start, stop, block_size=65536):
+        self.file = file
+        self.start = start
+        self.stop = stop
+        self.block_size = block_size
+
+    def __iter__(self):
+        try:
+            for data in _read_range(self.file, self.start, self.stop,
+                                    self.block_size):
+                yield data
+        finally:
+            self.file.close()
+
+    def close(self):
+        self.file.close()
+
+
+class MultipartByteRangesIterator:
+    """ Iterates over a multipart/byteranges body (RFC 7233, appendix A)
+        holding several ranges of an open file.  content_length is the
+        exact length of the body, for the Content-Length header.
+    """
+
+    def __init__(self, file, ranges, content_type, file_length,
+                 block_size=65536, boundary=None):
+        if boundary is None:
+            boundary = os.urandom(12).hex()
+        self.file = file
+        self.ranges = ranges
+        self.boundary = boundary
+        self.block_size = block_size
+        self.content_type = 'multipart/byteranges; boundary={}'.format(
+            boundary)
+        if content_type is None:
+            content_type = 'application/octet-stream'
+        self.part_headers = [
+            '\r\n--{}\r\nContent-Type: {}\r\nContent-Range: bytes '
+            '{}-{}/{}\r\n\r\n'.format(boundary, content_type, start,
+                                      stop - 1, file_length).encode('latin-1')
+            for start, stop in ranges]
+        self.closing_boundary = '\r\n--{}--\r\n'.format(boundary).encode(
+            'latin-1')
+        self.content_length = (sum(len(h) for h in self.part_headers) +
+                               sum(stop - start for start, stop in ranges) +
+                               len(self.closing_boundary))
+
+    def __iter__(self):
+        try:
+            for part_header, (start, stop) in zip(self.part_headers,
+                                                  self.ranges):
+                yield part_header
+                for data in _read_range(self.file, start, stop,
+                                        self.block_size):
+                    yield data
+            yield self.closing_boundary
+        finally:
+            self.file.close()
+
+    def close(self):
+        self.file.close()
+
+
+def _read_range(file, start, stop, block_size):
+    file.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        data = file.read(min(block_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
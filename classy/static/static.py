@@ -1,10 +1,16 @@
 # standard libraries
+import io
 import os
+import math
+import mmap
+import secrets
 import mimetypes
+import urllib.parse
 # third party libraries
 pass
 # first party libraries
-from .. import (controllers, exceptions)
+from . import (ranges, compression, listing)
+from .. import (controllers, exceptions, caching)
 
 
 # do not load mimetypes from Windows registry
@@ -17,12 +23,15 @@ mimetypes.add_type('image/x-icon', '.ico')
 
 class FileIterator:
     
-    def __init__(self, filename, block_size=65536):
+    def __init__(self, filename, block_size=65536, file=None):
         self.filename = filename
         self.block_size = block_size
-        self.file = open(filename, 'rb')
-        self.last_modified = os.path.getmtime(filename)
-        self.content_length = os.path.getsize(filename)
+        if file is None:
+            file = open(filename, 'rb')
+        self.file = file
+        stat = os.fstat(file.fileno())
+        self.last_modified = stat.st_mtime
+        self.content_length = stat.st_size
 
     def __iter__(self):
         try:
@@ -33,14 +42,364 @@ class FileIterator:
         finally:
             self.file.close()
 
+    def close(self):
+        self.file.close()
 
-class FileController(controllers.Controller):
+
+class MemoryMappedFileIterator(FileIterator):
+    """ Iterates over a file in blocks sliced from a read-only memory map of 
+        it, which avoids a read system call per block (but not the copy of 
+        each block into bytes).
+    """
+
+    def __iter__(self):
+        try:
+            if self.content_length == 0:
+                return
+            with mmap.mmap(self.file.fileno(), 0, 
+                           access=mmap.ACCESS_READ) as memory:
+                block_size = self.block_size
+                for offset in range(0, len(memory), block_size):
+                    yield memory[offset:(offset + block_size)]
+        finally:
+            self.file.close()
+
+
+# sentinel returned when a file should be sent without a content coding
+_IDENTITY = object()
+
+
+class StaticController(controllers.Controller):
+    """ Base class for controllers serving files from disk.
+
+        Where the WSGI server provides wsgi.file_wrapper, files are handed 
+        to it so the server can send them without iterating over them in 
+        Python (and, for servers that support it, with sendfile).  Otherwise 
+        files are read in blocks of block_size bytes.  Files of at least 
+        mmap_threshold bytes may be sent from a memory map instead, but as 
+        each block is still copied into a bytes object (which WSGI 
+        requires) that is no faster than reading, so mmap_threshold is 
+        None (off) by default.
+
+        Responses carry a strong ETag and a Last-Modified header, and 
+        conditional requests (If-None-Match, If-Modified-Since) for 
+        unchanged files are answered with 304 Not Modified without opening 
+        the file.  cache_max_age sets the Cache-Control max-age, either for 
+        every file or per content type (see caching.max_age).
+
+        Range requests (honoring If-Range) are answered with 206 Partial 
+        Content, seeking to and sending only the requested bytes; several 
+        ranges (up to max_ranges) are sent as multipart/byteranges, and 
+        unsatisfiable ranges are answered with 416.
+
+        Setting asset_cache to a caching.AssetCache (which may be shared 
+        between controllers) keeps small files and their headers in memory; 
+        cached files are served without touching the file system except 
+        for a periodic stat.
+
+        Setting gzip to True compresses files whose content type is in 
+        gzip_types for clients that accept it (always with Vary: 
+        Accept-Encoding).  A precompressed sibling (eg, app.js.gz for 
+        app.js) is served if present and precompressed is True; otherwise 
+        files of gzip_min_size to gzip_max_size bytes are compressed on the 
+        fly and the result is kept in gzip_cache, an AssetCache bounded by 
+        memory and shared by all static controllers unless overridden.
+
+        Setting allow_uploads to True lets PUT replace files (FileController)
+        or create and replace them (DirectoryController).  The body is 
+        streamed to a temporary file beside the target, which is then 
+        renamed over it, so readers never see a partial file; a new file 
+        gets the usual permissions (0666 less the umask) and a replaced one 
+        keeps its own.  Uploads larger than max_upload_size are refused 
+        with 413, and bodies of unknown length that the server hasn't read 
+        to their end with 411.
+
+        A file requested by a fingerprinted (content-hashed) name, see
+        DirectoryController.manifest, is sent with Cache-Control: public,
+        max-age=immutable_max_age, immutable.
+    """
+
+    block_size = 65536
+    mmap_threshold = None
+    cache_max_age = None
+    max_ranges = 16
+    asset_cache = None
+    gzip = False
+    gzip_types = compression.GZIP_TYPES
+    gzip_level = 6
+    gzip_min_size = 1024
+    gzip_max_size = 8388608
+    gzip_cache = caching.AssetCache(max_bytes=33554432, 
+                                    max_file_size=8388608)
+    precompressed = True
+    allow_uploads = False
+    max_upload_size = None
+    immutable_max_age = 31536000
+    # set when a request is for a fingerprinted name
+    fingerprinted = False
+
+    def _write_upload(self, filename):
+        """ Streams the request body into filename, atomically replacing 
+            it, and answers 201 Created or 204 No Content.
+        """
+        if not self.allow_uploads:
+            raise exceptions.HTTPNotImplemented
+        directory = os.path.dirname(filename)
+        if os.path.isdir(filename) or not os.path.isdir(directory):
+            raise exceptions.HTTPConflict
+        try:
+            replaced_mode = os.stat(filename).st_mode & 0o7777
+        except FileNotFoundError:
+            replaced_mode = None
+        temporary_filename, file = _create_upload_file(directory)
+        try:
+            with file:
+                for data in self.iter_body(self.block_size, 
+                                           self.max_upload_size):
+                    file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            # a replaced file keeps its permissions
+            if replaced_mode is not None:
+                os.chmod(temporary_filename, replaced_mode)
+            os.replace(temporary_filename, filename)
+        except BaseException:
+            os.unlink(temporary_filename)
+            raise
+        for cache in (self.asset_cache, self.gzip_cache):
+            if cache is not None:
+                cache.invalidate(filename)
+        self.response.status = 201 if replaced_mode is None else 204
+
+    def _set_validators(self, stat):
+        etag = caching.file_etag(stat)
+        self.response.headers['ETag'] = etag
+        self.response.last_modified = stat.st_mtime
+        return etag
+
+    def _set_cache_control(self):
+        if self.fingerprinted:
+            self.response.headers['Cache-Control'] = \
+                'public, max-age={}, immutable'.format(self.immutable_max_age)
+            return
+        max_age = caching.max_age(self.cache_max_age, 
+                                  self.response.content_type)
+        if max_age is not None:
+            self.response.cache_control.max_age = max_age
+
+    def _cached_asset(self, filename):
+        if self.asset_cache is None:
+            return None
+        return self.asset_cache.get(filename)
+
+    def _serve(self, filename, asset=None):
+        """ Serves the file (or its cached asset), negotiating its content 
+            coding first.  The response's content type and encoding should 
+            already be set.
+        """
+        gzip_is_acceptable = self._negotiate_gzip()
+        if gzip_is_acceptable:
+            app_iter = self._serve_gzip(filename, asset)
+            if app_iter is not _IDENTITY:
+                return app_iter
+        if asset is not None:
+            return self._serve_asset(asset)
+        return self._serve_file(filename)
+
+    def _negotiate_gzip(self):
+        response = self.response
+        gzip_is_applicable = (self.gzip and 
+                              response.content_encoding is None and 
+                              response.content_type in self.gzip_types)
+        if not gzip_is_applicable:
+            return False
+        response.vary = ('Accept-Encoding', )
+        accept_encoding = self.request.headers.get('Accept-Encoding', None)
+        return compression.accepts_gzip(accept_encoding)
+
+    def _serve_gzip(self, filename, asset=None):
+        """ Serves the gzip-compressed file, or returns _IDENTITY if it 
+            should be sent uncompressed instead.
+        """
+        # precompressed sibling
+        if self.precompressed:
+            compressed_filename = filename + '.gz'
+            compressed_asset = self._cached_asset(compressed_filename)
+            if compressed_asset is not None:
+                return self._serve_asset(compressed_asset)
+            if os.path.isfile(compressed_filename):
+                self.response.content_encoding = 'gzip'
+                return self._serve_file(compressed_filename)
+        # compressed on the fly
+        gzip_cache = self.gzip_cache
+        if gzip_cache is not None:
+            compressed_asset = gzip_cache.get(filename)
+            if compressed_asset is not None:
+                return self._serve_asset(compressed_asset)
+        if asset is not None:
+            body = asset.body
+            stat = asset.stat
+        else:
+            try:
+                with open(filename, 'rb') as file:
+                    stat = os.fstat(file.fileno())
+                    if not self.gzip_min_size <= stat.st_size <= \
+                            self.gzip_max_size:
+                        return _IDENTITY
+                    body = file.read()
+            except (IOError, OSError):
+                raise exceptions.HTTPGone
+        if not self.gzip_min_size <= len(body) <= self.gzip_max_size:
+            return _IDENTITY
+        # the compressed representation needs its own entity tag
+        etag = caching.file_etag(stat)
+        compressed_etag = etag[:-1] + '-gzip"'
+        compressed_asset = caching.CachedAsset(
+            filename, compression.gzip_compress(body, self.gzip_level), stat,
+            self.response.content_type, 'gzip', compressed_etag)
+        if gzip_cache is not None:
+            gzip_cache.put(compressed_asset)
+        return self._serve_asset(compressed_asset)
+
+    def _serve_asset(self, asset):
+        response = self.response
+        response.content_type = asset.content_type
+        response.content_encoding = asset.content_encoding
+        response.accept_ranges = 'bytes'
+        response.headers['ETag'] = asset.etag
+        response.headers['Last-Modified'] = asset.last_modified_header
+        self._set_cache_control()
+        if caching.is_not_modified(self.request, asset.etag, 
+                                   asset.last_modified):
+            caching.not_modified(response)
+            return None
+        byte_ranges = self._requested_ranges(asset.etag, asset.last_modified,
+                                             asset.content_length)
+        if byte_ranges is not None:
+            return self._serve_ranges(io.BytesIO(asset.body), byte_ranges, 
+                                      asset.content_length)
+        response.app_iter = [asset.body]
+        response.content_length = asset.content_length
+        return response.app_iter
+
+    def _serve_file(self, filename):
+        if self.asset_cache is not None:
+            asset = self.asset_cache.load(filename, 
+                                          self.response.content_type,
+                                          self.response.content_encoding)
+            if asset is not None:
+                return self._serve_asset(asset)
+        try:
+            stat = os.stat(filename)
+        except (IOError, OSError):
+            # the file used to exist, but no longer does
+            raise exceptions.HTTPGone
+        self.response.accept_ranges = 'bytes'
+        etag = self._set_validators(stat)
+        self._set_cache_control()
+        if caching.is_not_modified(self.request, etag, stat.st_mtime):
+            caching.not_modified(self.response)
+            return None
+        try:
+            file = open(filename, 'rb')
+        except (IOError, OSError):
+            raise exceptions.HTTPGone
+        try:
+            opened_stat = os.fstat(file.fileno())
+        except (IOError, OSError):
+            file.close()
+            raise exceptions.HTTPGone
+        if caching.file_etag(opened_stat) != etag:
+            # the file changed between stat and open
+            etag = self._set_validators(opened_stat)
+        content_length = opened_stat.st_size
+        byte_ranges = self._requested_ranges(etag, opened_stat.st_mtime,
+                                             content_length)
+        if byte_ranges is not None:
+            return self._serve_ranges(file, byte_ranges, content_length)
+        file_wrapper = self.request.environ.get('wsgi.file_wrapper', None)
+        if file_wrapper is not None:
+            app_iter = file_wrapper(file, self.block_size)
+        elif self.mmap_threshold is not None and \
+                content_length >= self.mmap_threshold:
+            app_iter = MemoryMappedFileIterator(filename, self.block_size, 
+                                                file)
+        else:
+            app_iter = FileIterator(filename, self.block_size, file)
+        # NB: webob clears content_length when app_iter is set
+        self.response.app_iter = app_iter
+        self.response.content_length = content_length
+        return app_iter
+
+    def _requested_ranges(self, etag, last_modified, content_length):
+        range_header = self.request.headers.get('Range', None)
+        if range_header is None or self.request.method != 'GET':
+            return None
+        if not ranges.if_range_matches(self.request, etag, last_modified):
+            return None
+        return ranges.parse_range(range_header, content_length, 
+                                  self.max_ranges)
+
+    def _serve_ranges(self, file, byte_ranges, content_length):
+        if not byte_ranges:
+            file.close()
+            response = exceptions.HTTPRequestRangeNotSatisfiable()
+            response.headers['Content-Range'] = 'bytes */{}'.format(
+                content_length)
+            raise response
+        self.response.status = 206
+        if len(byte_ranges) == 1:
+            (start, stop), = byte_ranges
+            file_wrapper = self.request.environ.get('wsgi.file_wrapper', None)
+            if file_wrapper is not None:
+                # PEP 3333 servers send from the current position and no 
+                # more than Content-Length bytes
+                file.seek(start)
+                app_iter = file_wrapper(file, self.block_size)
+            else:
+                app_iter = ranges.RangeFileIterator(file, start, stop, 
+                                                    self.block_size)
+            self.response.app_iter = app_iter
+            self.response.content_length = stop - start
+            self.response.content_range = (start, stop, content_length)
+        else:
+            app_iter = ranges.MultipartByteRangesIterator(
+                file, byte_ranges, self.response.content_type, 
+                content_length, self.block_size)
+            self.response.content_type = app_iter.content_type
+            self.response.content_encoding = None
+            self.response.app_iter = app_iter
+            self.response.content_length = app_iter.content_length
+        return app_iter
+
+
+def _create_upload_file(directory):
+    """ Creates a file with a unique hidden name in directory, open for 
+        writing, and returns its name and the file.  Unlike tempfile's 
+        (always 0600), its permissions are those of any new file: 0666 
+        less the umask.
+    """
+    while True:
+        filename = os.path.join(directory, 
+                                '.upload-{}'.format(secrets.token_hex(8)))
+        try:
+            descriptor = os.open(filename, os.O_WRONLY | os.O_CREAT | 
+                                 os.O_EXCL | getattr(os, 'O_BINARY', 0), 
+                                 0o666)
+        except FileExistsError:
+            continue
+        return filename, os.fdopen(descriptor, 'wb')
+
+
+class FileController(StaticController):
 
     filename = ''
 
     def __init__(self, *args, **kwargs):
-        controllers.Controller.__init__(self, *args, **kwargs)
-        filename_is_file = os.path.isfile(self.filename)
+        StaticController.__init__(self, *args, **kwargs)
+        filename_is_cached = (self.asset_cache is not None and
+                              self.filename in self.asset_cache)
+        filename_is_file = filename_is_cached or os.path.isfile(self.filename)
         if not filename_is_file:
             # TODO: this really ought to be checked at metaclass instantiation
             error_message = 'Filename does not exist or is not a \
@@ -51,58 +410,190 @@ class FileController(controllers.Controller):
         self.response.content_encoding = content_encoding
 
     def get(self):
-        try:
-            file_iterator = FileIterator(self.filename)
-        except (IOError, OSError):
-            # the file used to exist, but no longer does
-            raise exceptions.HTTPGone
-        self.response.content_length = file_iterator.content_length
-        self.response.app_iter = file_iterator
-        return file_iterator
+        asset = self._cached_asset(self.filename)
+        return self._serve(self.filename, asset)
+
+    def put(self):
+        self._write_upload(os.path.abspath(self.filename))
 
-    def put(self, *args):
-        raise exceptions.HTTPNotImplemented
 
+class DirectoryController(StaticController):
+    """ Serves the files under path, except hidden ones (whose names start
+        with a dot, such as the default manifest file), which are neither
+        served nor written.  Requests for a directory are refused with 403
+        unless directory_listing is True, in which case they're
+        answered with a listing of it, as HTML or, if the format query
+        parameter or the Accept header asks for it, as JSON.  Listings are
+        paginated (the page and per_page query parameters, per_page
+        defaulting to listing_page_size and capped at
+        listing_max_page_size) and sorted by name, size or modified time
+        (the sort and order parameters), directories first.  Pages are
+        streamed as they're rendered and kept in listing_cache, a
+        listing.ListingCache shared by all directory controllers unless
+        overridden, until the directory changes.
 
-class DirectoryController(controllers.Controller):
+        Setting manifest to a manifest.Manifest of path serves every file
+        under its fingerprinted name too (eg, js/app.3f9a1c2e.js for
+        js/app.js), with far-future immutable caching; the manifest is
+        prepared when the application is configured, and its url method
+        gives the fingerprinted URL to link to for a file.
+    """
 
     path = ''
+    manifest = None
+    directory_listing = False
+    listing_page_size = 1000
+    listing_max_page_size = 10000
+    listing_cache = listing.ListingCache()
 
     def __init__(self, *args, **kwargs):
-        controllers.Controller.__init__(self, *args, **kwargs)
+        StaticController.__init__(self, *args, **kwargs)
+        if self.asset_cache is None:
+            self._check_path()
+
+    @classmethod
+    def __configure__(cls, configuration):
+        if cls.manifest is not None and not cls.manifest.prepared:
+            cls.manifest.prepare()
+
+    def _check_path(self):
         path_is_directory = os.path.isdir(self.path)
         if not path_is_directory:
             error_message = 'Path does not exist or is not a \
                              directory: {}'.format(self.path)
             raise ValueError(error_message)
 
-    def get(self, *path_segments):
-        if len(path_segments) > 0:
-            relative_path = os.path.join(*path_segments)
-        else:
-            relative_path = ''
-        absolute_path = os.path.abspath(os.path.join(self.path, relative_path))
-        path_not_subhierarchy = not absolute_path.startswith(self.path)
-        if path_not_subhierarchy:
+    def _absolute_path(self, path_segments):
+        # the segments are from the percent-encoded request path
+        path_segments = [urllib.parse.unquote(segment) 
+                         for segment in path_segments]
+        relative_path = os.path.join('', *path_segments)
+        return os.path.abspath(os.path.join(self.path, relative_path))
+
+    def _check_subhierarchy(self, absolute_path):
+        # a prefix check would let /srv/static-evil through for /srv/static
+        root = os.path.abspath(self.path)
+        try:
+            path_is_subhierarchy = \
+                os.path.commonpath([root, absolute_path]) == root
+        except ValueError:
+            path_is_subhierarchy = False
+        if not path_is_subhierarchy:
             raise exceptions.HTTPForbidden
+
+    def _is_hidden(self, absolute_path):
+        """ Whether the path is, or is under, a dot-file (eg, the default 
+            manifest file or an upload in progress).
+        """
+        relative_path = os.path.relpath(absolute_path, 
+                                        os.path.abspath(self.path))
+        return any(name.startswith('.') and name != '.'
+                   for name in relative_path.split(os.sep))
+
+    def _resolve_fingerprint(self, absolute_path):
+        """ The file a fingerprinted path refers to, if it is one. """
+        relative_path = os.path.relpath(absolute_path, self.manifest.path)
+        name = self.manifest.resolve('/'.join(relative_path.split(os.sep)))
+        if name is None:
+            return absolute_path
+        self.fingerprinted = True
+        return os.path.join(self.manifest.path, *name.split('/'))
+
+    def get(self, *path_segments):
+        absolute_path = self._absolute_path(path_segments)
+        if self.manifest is not None and path_segments:
+            absolute_path = self._resolve_fingerprint(absolute_path)
+        self._check_subhierarchy(absolute_path)
+        if self._is_hidden(absolute_path):
+            raise exceptions.HTTPNotFound
+        asset = self._cached_asset(absolute_path)
+        if asset is not None:
+            self.response.content_type = asset.content_type
+            self.response.content_encoding = asset.content_encoding
+            return self._serve(absolute_path, asset)
+        if self.asset_cache is not None:
+            # deferred from instantiation so cached files need no stat
+            self._check_path()
         path_exists = os.path.exists(absolute_path)
         if not path_exists:
             raise exceptions.HTTPNotFound
         path_is_file = os.path.isfile(absolute_path)
         if not path_is_file:
-            # TODO: return directory listing index (configurable via metaclass)
+            return self._serve_listing(absolute_path)
+        content_type, content_encoding = mimetypes.guess_type(absolute_path)
+        self.response.content_type = content_type
+        self.response.content_encoding = content_encoding
+        return self._serve(absolute_path)
+
+    def _serve_listing(self, absolute_path):
+        if not self.directory_listing:
             raise exceptions.HTTPForbidden
+        parameters = self.request.GET
+        sort = parameters.get('sort', 'name')
+        order = parameters.get('order', 'asc')
+        listing_format = parameters.get('format', None)
+        if listing_format is None:
+            self.response.vary = ('Accept', )
+            offers = self.request.accept.acceptable_offers(
+                ['text/html', 'application/json'])
+            listing_format = 'json' if offers and \
+                offers[0][0] == 'application/json' else 'html'
         try:
-            file_iterator = FileIterator(absolute_path)
+            page = int(parameters.get('page', 1))
+            per_page = int(parameters.get('per_page', 
+                                          self.listing_page_size))
+        except ValueError:
+            raise exceptions.HTTPBadRequest('Invalid page or per_page')
+        if sort not in listing.SORT_KEYS or order not in ('asc', 'desc') or \
+                listing_format not in ('html', 'json') or page < 1 or \
+                per_page < 1:
+            raise exceptions.HTTPBadRequest('Invalid listing parameters')
+        per_page = min(per_page, self.listing_max_page_size)
+        reverse = order == 'desc'
+        url = urllib.parse.unquote(self.request.path)
+        if not url.endswith('/'):
+            url += '/'
+        if listing_format == 'json':
+            self.response.content_type = 'application/json'
+            render = listing.render_json
+        else:
+            self.response.content_type = 'text/html'
+            self.response.charset = 'utf-8'
+            render = listing.render_html
+        try:
+            stat = os.stat(absolute_path)
         except (IOError, OSError):
-            # the file used to exist, but no longer does
             raise exceptions.HTTPGone
-        self.response.content_length = file_iterator.content_length
-        content_type, content_encoding = mimetypes.guess_type(absolute_path)
-        self.response.content_type = content_type
-        self.response.content_encoding = content_encoding
-        self.response.app_iter = file_iterator
-        return file_iterator
+        cache = self.listing_cache
+        variant = (listing_format, sort, reverse, page, per_page, url)
+        if cache is not None:
+            body = cache.page(absolute_path, stat, variant)
+            if body is not None:
+                self.response.body = body
+                return None
+            entries = cache.entries(absolute_path, stat, sort, reverse)
+        else:
+            entries = listing.sort_entries(listing.scan(absolute_path), sort,
+                                           reverse)
+        total = len(entries)
+        pages = max(1, math.ceil(total / per_page))
+        if page > pages:
+            raise exceptions.HTTPNotFound
+        start = (page - 1) * per_page
+        app_iter = render(url, entries[start:(start + per_page)], sort, 
+                          reverse, page, pages, per_page, total)
+        if cache is not None:
+            app_iter = cache.collect(absolute_path, stat, variant, app_iter)
+        self.response.app_iter = app_iter
+        return app_iter
 
     def put(self, *path_segments):
-        raise exceptions.HTTPNotImplemented
+        if len(path_segments) == 0:
+            raise exceptions.HTTPMethodNotAllowed
+        absolute_path = self._absolute_path(path_segments)
+        self._check_subhierarchy(absolute_path)
+        if self._is_hidden(absolute_path):
+            raise exceptions.HTTPForbidden
+        if self.asset_cache is not None:
+            self._check_path()
+        self._write_upload(absolute_path)
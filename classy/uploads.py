@@ -0,0 +1,193 @@
+# standard libraries
+import tempfile
+import email.parser
+# third party libraries
+pass
+# first party libraries
+from . import exceptions
+
+
+__all__ = ('iter_body', 'iter_multipart', 'Part')
+
+
+def iter_body(environ, block_size=65536, max_size=None):
+    """ Iterates over a request body straight from wsgi.input, a block at a
+        time, without buffering it.  Reads Content-Length bytes, or until
+        the end of the input for a chunked request if the server marks its
+        input as terminated (wsgi.input_terminated); a body of unknown 
+        length that can't be read to its end is refused with 411 Length 
+        Required rather than taken to be empty.  Raises 413 Request Entity 
+        Too Large as soon as the body is known to exceed max_size.
+
+    >>> import io
+    >>> environ = {'wsgi.input': io.BytesIO(b'abcdefgh'),
+    ...            'CONTENT_LENGTH': '8'}
+    >>> list(iter_body(environ, block_size=3))
+    [b'abc', b'def', b'gh']
+    >>> environ['wsgi.input'].seek(0)
+    0
+    >>> list(iter_body(environ, max_size=4))
+    Traceback (most recent call last):
+      ...
+    webob.exc.HTTPRequestEntityTooLarge: The body of your request was too large for this server.
+    >>> list(iter_body({'wsgi.input': io.BytesIO(b'abc')}))
+    Traceback (most recent call last):
+      ...
+    webob.exc.HTTPLengthRequired: Content-Length header required.
+    >>> list(iter_body({'wsgi.input': io.BytesIO(b'abc'),
+    ...                 'wsgi.input_terminated': True}))
+    [b'abc']
+
+    """
+    stream = environ['wsgi.input']
+    try:
+        remaining = int(environ.get('CONTENT_LENGTH', None) or -1)
+    except ValueError:
+        raise exceptions.HTTPBadRequest('Invalid Content-Length')
+    if remaining < 0:
+        if not environ.get('wsgi.input_terminated', False):
+            raise exceptions.HTTPLengthRequired
+        remaining = None
+    if remaining is not None and max_size is not None and \
+            remaining > max_size:
+        raise exceptions.HTTPRequestEntityTooLarge
+    size = 0
+    while remaining is None or remaining > 0:
+        if remaining is None:
+            data = stream.read(block_size)
+        else:
+            data = stream.read(min(block_size, remaining))
+        if not data:
+            break
+        size += len(data)
+        if max_size is not None and size > max_size:
+            raise exceptions.HTTPRequestEntityTooLarge
+        if remaining is not None:
+            remaining -= len(data)
+        yield data
+
+
+class Part:
+    """ One part of a multipart/form-data body: its headers, form field
+        name, filename (None for plain fields) and content in file, a
+        temporary file that is kept in memory up to a threshold and then
+        spooled to disk.
+    """
+
+    def __init__(self, headers, file):
+        self.headers = headers
+        self.name = headers.get_param('name', header='content-disposition')
+        self.filename = headers.get_filename()
+        self.content_type = headers.get_content_type()
+        self.file = file
+
+    @property
+    def size(self):
+        position = self.file.tell()
+        size = self.file.seek(0, 2)
+        self.file.seek(position)
+        return size
+
+    @property
+    def value(self):
+        """ The content decoded as text (for plain form fields). """
+        self.file.seek(0)
+        value = self.file.read()
+        self.file.seek(0)
+        charset = self.headers.get_content_charset() or 'utf-8'
+        return value.decode(charset, 'replace')
+
+    def close(self):
+        self.file.close()
+
+
+def iter_multipart(environ, memory_threshold=1048576, max_size=None,
+                   block_size=65536, max_header_size=16384):
+    """ Parses a multipart/form-data body as it streams in, yielding each
+        Part once it is complete, with its file rewound.  A part's content
+        is held in memory up to memory_threshold bytes and spooled to disk
+        beyond that, so the memory used doesn't grow with the size of the
+        upload.  The caller should close the parts it keeps.
+
+    >>> import io
+    >>> body = (b'--xyz\\r\\nContent-Disposition: form-data; name="title"\\r\\n'
+    ...         b'\\r\\nHoliday\\r\\n--xyz\\r\\nContent-Disposition: form-data; '
+    ...         b'name="photo"; filename="beach.jpg"\\r\\nContent-Type: '
+    ...         b'image/jpeg\\r\\n\\r\\n\\xff\\xd8--xy\\r\\n\\xff\\xd9\\r\\n--xyz--\\r\\n')
+    >>> environ = {'wsgi.input': io.BytesIO(body),
+    ...            'CONTENT_LENGTH': str(len(body)),
+    ...            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz'}
+    >>> [(p.name, p.filename, p.content_type, p.file.read())
+    ...  for p in iter_multipart(environ, block_size=7)]
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [('title', None, 'text/plain', b'Holiday'),
+     ('photo', 'beach.jpg', 'image/jpeg', b'\\xff\\xd8--xy\\r\\n\\xff\\xd9')]
+
+    """
+    headers = _parse_headers('Content-Type: {}\r\n\r\n'.format(
+        environ.get('CONTENT_TYPE', '')))
+    boundary = headers.get_param('boundary')
+    if headers.get_content_type() != 'multipart/form-data' or not boundary:
+        raise exceptions.HTTPBadRequest('Expected a multipart/form-data body')
+    delimiter = b'\r\n--' + boundary.encode('latin-1')
+    chunks = iter_body(environ, block_size, max_size)
+    # a leading CRLF lets the first boundary match the same delimiter
+    buffer = b'\r\n'
+    position = None
+    # skip the preamble
+    while position is None:
+        position = _find(buffer, delimiter)
+        if position is None:
+            buffer = buffer[-len(delimiter):]
+            buffer = _read_more(chunks, buffer)
+    buffer = buffer[position + len(delimiter):]
+    while True:
+        # after a delimiter: '--' closes the body, CRLF starts a part
+        while len(buffer) < 2:
+            buffer = _read_more(chunks, buffer)
+        if buffer.startswith(b'--'):
+            break
+        # part headers
+        while b'\r\n\r\n' not in buffer:
+            if len(buffer) > max_header_size:
+                raise exceptions.HTTPBadRequest('Multipart headers too large')
+            buffer = _read_more(chunks, buffer)
+        header_data, buffer = buffer.split(b'\r\n\r\n', 1)
+        part_headers = _parse_headers(header_data[2:].decode('utf-8',
+                                                             'replace') +
+                                      '\r\n\r\n')
+        file = tempfile.SpooledTemporaryFile(max_size=memory_threshold)
+        # part content, up to the next delimiter
+        try:
+            while True:
+                position = _find(buffer, delimiter)
+                if position is not None:
+                    file.write(buffer[:position])
+                    buffer = buffer[position + len(delimiter):]
+                    break
+                # keep enough to match a delimiter split across reads
+                safe_length = len(buffer) - len(delimiter) + 1
+                if safe_length > 0:
+                    file.write(buffer[:safe_length])
+                    buffer = buffer[safe_length:]
+                buffer = _read_more(chunks, buffer)
+        except BaseException:
+            file.close()
+            raise
+        file.seek(0)
+        yield Part(part_headers, file)
+
+
+def _find(buffer, delimiter):
+    position = buffer.find(delimiter)
+    return None if position < 0 else position
+
+
+def _read_more(chunks, buffer):
+    for data in chunks:
+        return buffer + data
+    raise exceptions.HTTPBadRequest('Incomplete multipart body')
+
+
+def _parse_headers(text):
+    return email.parser.HeaderParser().parsestr(text)
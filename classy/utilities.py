@@ -1,5 +1,5 @@
 # standard libraries
-import collections
+import collections.abc
 # third party libraries
 pass
 # first party libraries
@@ -28,13 +28,20 @@ class UrlSegment:
 
     """
 
-    def __init__(self, segment):
+    __slots__ = ('segment', 'normalized')
+
+    def __init__(self, segment, normalized=None):
         self.segment = segment
-        self.normalized = segment.replace('-', '_').replace('.', '_')
+        if normalized is None:
+            normalized = _normalize_segment(segment)
+        self.normalized = normalized
 
     def __eq__(self, other):
         return self.normalized == other.normalized
 
+    def __hash__(self):
+        return hash(self.normalized)
+
     def __str__(self):
         return self.segment
 
@@ -42,11 +49,40 @@ class UrlSegment:
         return "UrlPathSegment('{}')".format(self.segment)
 
 
-class Url(collections.MutableSequence):
+def _normalize_segment(segment):
+    return segment.replace('-', '_').replace('.', '_')
+
+
+class _UrlSegments:
+    """ The parsed segments of a URL, shared by the URL and every slice 
+        taken of it.  Normalized forms are computed on first use.
+    """
+
+    __slots__ = ('segments', '_normalized')
+
+    def __init__(self, segments):
+        self.segments = segments
+        self._normalized = None
+
+    def _get_normalized(self):
+        normalized = self._normalized
+        if normalized is None:
+            normalized = tuple(map(_normalize_segment, self.segments))
+            self._normalized = normalized
+        return normalized
+    normalized = property(_get_normalized)
+
+
+class Url(collections.abc.Sequence):
     """ Supports URL path traversal and comparison.  This doesn't 
         necessarily accurately reflect absolute paths 
         (ie, '/a/b/c' and 'a/b/c' are equivalent).
 
+        Urls are immutable.  The path is split once, and slicing a Url 
+        returns a view onto the same segments (an offset and a length) 
+        rather than re-joining and re-splitting the path, so slicing 
+        repeatedly while routing doesn't allocate per segment.
+
         >>> url1 = Url('/a/b/c')
         >>> url2 = Url('/a')
         >>> url3 = Url('/')
@@ -59,43 +95,88 @@ class Url(collections.MutableSequence):
         True
         >>> url2.starts_with(url4)
         False
+        >>> url5 = Url('/people/brian-petersen/scans')[1:]
+        >>> url5
+        Url('brian-petersen/scans')
+        >>> url5.segments
+        ('brian-petersen', 'scans')
+        >>> url5.normalized_segments
+        ('brian_petersen', 'scans')
+        >>> url5[0]
+        UrlPathSegment('brian-petersen')
+        >>> url5[1:][0]
+        UrlPathSegment('scans')
+        >>> len(url5[5:])
+        0
 
     """
 
+    __slots__ = ('_segments', '_start', '_stop')
+
     def __init__(self, url):
-        super().__init__()
-        # may want to change this to a deque for efficiencies sake
-        self.url_segments = [UrlSegment(u) for u in url.split('/') if u != '']
+        segments = tuple(u for u in url.split('/') if u != '')
+        self._segments = _UrlSegments(segments)
+        self._start = 0
+        self._stop = len(segments)
+
+    @classmethod
+    def _view(cls, segments, start, stop):
+        url = cls.__new__(cls)
+        url._segments = segments
+        url._start = start
+        url._stop = stop
+        return url
+
+    def _get_segments(self):
+        segments = self._segments.segments
+        if self._start == 0 and self._stop == len(segments):
+            return segments
+        return segments[self._start:self._stop]
+    segments = property(_get_segments)
+
+    def _get_normalized_segments(self):
+        normalized = self._segments.normalized
+        if self._start == 0 and self._stop == len(normalized):
+            return normalized
+        return normalized[self._start:self._stop]
+    normalized_segments = property(_get_normalized_segments)
 
     def starts_with(self, other):
         if len(other) > len(self):
             return False
         else:
-            return all([s == o
-                        for s, o in zip(self.url_segments, other.url_segments)
-                        ])
+            return (self.normalized_segments[:len(other)] == 
+                    other.normalized_segments)
 
     def _get_url(self):
-        return '/'.join(map(str, self.url_segments))
+        return '/'.join(self.segments)
     url = property(_get_url)
 
-    def insert(self, item, value):
-        self.url_segments.insert(item, value)
-
-    def __delitem__(self, item):
-        del self.url_segments[item]
-
-    def __setitem__(self, item):
-        pass
-
     def __getitem__(self, item):
         if isinstance(item, slice):
-            return Url('/'.join(map(str, self.url_segments[item])))
+            start, stop, step = item.indices(self._stop - self._start)
+            if step != 1:
+                return Url('/'.join(self.segments[item]))
+            stop = max(start, stop)
+            return self._view(self._segments, self._start + start,
+                              self._start + stop)
         else:
-            return self.url_segments[item]
+            length = self._stop - self._start
+            if item < 0:
+                item += length
+            if not 0 <= item < length:
+                raise IndexError('Url index out of range')
+            index = self._start + item
+            return UrlSegment(self._segments.segments[index],
+                              self._segments.normalized[index])
+
+    def __iter__(self):
+        for segment, normalized in zip(self.segments, 
+                                       self.normalized_segments):
+            yield UrlSegment(segment, normalized)
 
     def __len__(self):
-        return len(self.url_segments)
+        return self._stop - self._start
 
     def __str__(self):
         return self.url
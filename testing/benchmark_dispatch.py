@@ -0,0 +1,102 @@
+""" Microbenchmark of Application.__call__ on a hello-world route.
+
+    Compares the current dispatch (a per-controller, per-method plan
+    computed by configure, and a response that is only built if the
+    handler or view uses it) with the previous dispatch, reproduced below
+    as LegacyApplication: a webob.Response made for every request, then
+    allowed_methods and the handler looked up with getattr and the view
+    always applied.  Also times a handler that touches its response, which
+    takes the general path under both.
+
+    Run with: python testing/benchmark_dispatch.py [requests]
+"""
+# standard libraries
+import io
+import sys
+import time
+import logging
+# third party libraries
+import webob
+# first party libraries
+import classy
+from classy import exceptions
+
+
+class LegacyApplication(classy.Application):
+
+    def __call__(self, environ, start_response):
+        request = webob.Request(environ)
+        response = webob.Response()
+        url = request.path
+        method = request.method.lower()
+        Controller, args, kwargs = self._match(url, method)
+        if Controller is None:
+            response = exceptions.HTTPNotFound()
+            return response(environ, start_response)
+        controller = Controller(request, response, self.configuration)
+        with controller:
+            allowed_methods = getattr(Controller, 'allowed_methods', set())
+            if method not in allowed_methods:
+                raise exceptions.HTTPMethodNotAllowed
+            handler = getattr(controller, method)
+            returned = handler(*args, **kwargs)
+            controller.__view__(returned)
+        return controller.response(environ, start_response)
+
+
+class Hello(classy.Controller):
+
+    def get(self):
+        return 'Hello, world!'
+
+
+class Headers(classy.Controller):
+
+    def get(self):
+        self.response.cache_control = 'max-age=60'
+        return 'Hello, world!'
+
+
+def make_application(Application):
+    logger = logging.getLogger('classy.benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    application = Application()
+    application.routes = {}
+    application.configuration = {'logger': logger}
+    application.add_route('/hello', Hello)
+    application.add_route('/headers', Headers)
+    application.configure()
+    return application
+
+
+def run(application, path, requests):
+    environ = {'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path,
+               'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+               'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+               'REMOTE_ADDR': '127.0.0.1', 'wsgi.version': (1, 0),
+               'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+               'wsgi.errors': sys.stderr}
+    start_response = lambda status, headers: None
+    latencies = []
+    clock = time.perf_counter
+    for _ in range(requests):
+        start = clock()
+        b''.join(application(dict(environ), start_response))
+        latencies.append(clock() - start)
+    latencies.sort()
+    return (len(latencies) / sum(latencies),
+            latencies[len(latencies) // 2] * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6)
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for path in ('/hello', '/headers'):
+        for name, Application in (('before', LegacyApplication),
+                                  ('after', classy.Application)):
+            application = make_application(Application)
+            run(application, path, 1000)
+            print('{:<9} {:<7} {:>9.0f} req/s  p50 {:>6.2f}us  '
+                  'p99 {:>6.2f}us'.format(path, name,
+                                          *run(application, path, requests)))
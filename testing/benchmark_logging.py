@@ -0,0 +1,93 @@
+""" Benchmark of request logging: the per-request latency of the application
+    when Controller.__exit__ formats and writes each log line synchronously,
+    compared with handing raw fields to a log_queue.LogQueue whose background
+    thread formats and writes them.
+
+    Requests are made directly against the WSGI callable (no server), with
+    the log written to a temporary file; slow_write adds a delay to every
+    write to stand in for a stalled disk or handler.  A tenth of the
+    requests raise an error, so the traceback formatting is included.
+
+    Run with: python testing/benchmark_logging.py [requests] [slow_write_ms]
+"""
+# standard libraries
+import sys
+import time
+import logging
+import tempfile
+import statistics
+# third party libraries
+import webob
+# first party libraries
+import classy
+from classy import log_queue
+
+
+class SlowFileHandler(logging.FileHandler):
+
+    slow_write = 0.0
+
+    def emit(self, record):
+        if self.slow_write:
+            time.sleep(self.slow_write)
+        super().emit(record)
+
+
+class Hello(classy.Controller):
+
+    def get(self, number):
+        if int(number) % 10 == 0:
+            raise ValueError(number)
+        return 'hello {}'.format(number)
+
+
+def run(application, requests):
+    latencies = []
+    start_response = lambda status, headers: None
+    for number in range(requests):
+        environ = webob.Request.blank('/hello/{}'.format(number),
+                                      remote_addr='127.0.0.1').environ
+        start = time.perf_counter()
+        application(environ, start_response)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies, wall_time):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    mean = statistics.mean(latencies) * 1e6
+    print('{:<12} mean {:8.1f}us  p50 {:8.1f}us  p99 {:8.1f}us  '
+          'total (incl. flush) {:7.3f}s'.format(name, mean, p50, p99,
+                                                wall_time))
+
+
+def main(requests=20000, slow_write_ms=0.0):
+    with tempfile.NamedTemporaryFile(suffix='.log') as log_file:
+        handler = SlowFileHandler(log_file.name)
+        handler.slow_write = slow_write_ms / 1000
+        logger = logging.getLogger('classy.benchmark')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        for mode in ('synchronous', 'queued'):
+            application = classy.Application()
+            application.routes = {}
+            application.configuration = {'logger': logger}
+            if mode == 'queued':
+                application.configuration['log_queue_size'] = requests
+            application.add_route('/hello', Hello)
+            application.configure()
+            start = time.perf_counter()
+            latencies = run(application, requests)
+            log_queue.close_all()
+            report(mode, latencies, time.perf_counter() - start)
+        handler.close()
+
+
+if __name__ == '__main__':
+    arguments = [float(a) for a in sys.argv[1:3]]
+    if arguments:
+        arguments[0] = int(arguments[0])
+    main(*arguments)
@@ -0,0 +1,269 @@
+""" Benchmark suite for routing and dispatch over synthetic controller trees.
+
+    Generates a route table of width root controllers, each the top of a
+    tree of nested child controllers depth levels deep (every controller
+    has width children below the root level, capped by max_controllers).
+    Handlers cycle through the signatures routing has to bind: no
+    arguments, a required argument, defaulted arguments and *args.  A fixed
+    set of request paths (hits at every depth and a share of misses) is
+    then driven through:
+
+    * match: routing.match against the compiled route trie
+    * match_cached: Application._match with a MatchCache
+    * application: the full Application.__call__ with a fake WSGI environ
+
+    For each it reports operations per second, p50 and p99 latency, the
+    memory blocks retained per operation (the net change in
+    sys.getallocatedblocks, with the garbage collector disabled, so it
+    shows leaks and cache growth rather than every allocation made) and the
+    mean peak of memory allocated during an operation above what it started
+    with (traced by tracemalloc, so transient allocations count), and saves
+    them along with the parameters and current git commit as JSON, so runs
+    can be compared across commits.
+
+    Run with: python testing/benchmark_routing.py [--width 8] [--depth 3]
+                  [--requests 2000] [--seed 0] [--output results.json]
+    Compare with: python testing/benchmark_routing.py --compare a.json b.json
+"""
+# standard libraries
+import io
+import gc
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import subprocess
+import tracemalloc
+# third party libraries
+pass
+# first party libraries
+import classy
+from classy import routing
+
+
+def _no_arguments(self):
+    return 'ok'
+
+
+def _required(self, item_id):
+    return item_id
+
+
+def _defaulted(self, item_id=None, view='summary'):
+    return view
+
+
+def _var_positional(self, item_id, *args):
+    return item_id
+
+
+HANDLERS = (_no_arguments, _required, _defaulted, _var_positional)
+# the number of positional arguments a path should carry for each handler
+HANDLER_ARGUMENTS = {_no_arguments: (0, ), _required: (1, ),
+                     _defaulted: (0, 1, 2), _var_positional: (1, 2, 4)}
+
+
+def build_tree(width, depth, max_controllers=5000):
+    """ Returns the routes dict and a list of (path prefix, handler) for
+        every generated controller.
+    """
+    controllers = []
+    routes = {}
+
+    def _build(name, level, prefix):
+        handler = HANDLERS[len(controllers) % len(HANDLERS)]
+        attributes = {'get': handler}
+        controllers.append((prefix, handler))
+        if level < depth:
+            for index in range(width):
+                if len(controllers) >= max_controllers:
+                    break
+                child_name = 'child{}'.format(index)
+                attributes[child_name] = _build(
+                    '{}_{}'.format(name, child_name), level + 1,
+                    prefix + '/' + child_name)
+        return type(name, (classy.Controller, ), attributes)
+
+    for index in range(width):
+        prefix = '/root{}'.format(index)
+        routes[prefix] = _build('Root{}'.format(index), 1, prefix)
+    return routes, controllers
+
+
+def build_paths(controllers, requests, miss_ratio=0.1, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(requests):
+        prefix, handler = rng.choice(controllers)
+        if rng.random() < miss_ratio:
+            paths.append(prefix + '/no-such-child/x/y/z/w')
+            continue
+        arguments = rng.choice(HANDLER_ARGUMENTS[handler])
+        segments = ['item-{}'.format(rng.randrange(1000))
+                    for _ in range(arguments)]
+        paths.append('/'.join([prefix] + segments))
+    return paths
+
+
+def make_environ(path):
+    return {'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path,
+            'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'localhost',
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False}
+
+
+def measure(operation, inputs, repeat=3):
+    """ Runs operation over every input repeat times, returning ops/sec,
+        p50 and p99 latency (in microseconds), blocks retained per
+        operation and mean peak bytes per operation.
+    """
+    for item in inputs:
+        operation(item)
+    latencies = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        for item in inputs:
+            start = clock()
+            operation(item)
+            latencies.append(clock() - start)
+    gc.disable()
+    try:
+        gc.collect()
+        before = sys.getallocatedblocks()
+        for item in inputs:
+            operation(item)
+        retained_blocks = sys.getallocatedblocks() - before
+    finally:
+        gc.enable()
+    latencies.sort()
+    return {'ops_per_second': len(latencies) / sum(latencies),
+            'p50_us': latencies[len(latencies) // 2] * 1e6,
+            'p99_us': latencies[int(len(latencies) * 0.99)] * 1e6,
+            'retained_blocks_per_op': retained_blocks / len(inputs),
+            'peak_bytes_per_op': _peak_bytes(operation, inputs)}
+
+
+def _peak_bytes(operation, inputs):
+    """ The mean, over inputs, of the most memory traced at once during an
+        operation above what was traced before it.
+    """
+    peaks = 0
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            operation(item)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks += peak - baseline
+    finally:
+        tracemalloc.stop()
+    return peaks / len(inputs)
+
+
+def run(width, depth, requests, seed, max_controllers):
+    routes, controllers = build_tree(width, depth, max_controllers)
+    paths = build_paths(controllers, requests, seed=seed)
+    route_trie = routing.compile_routes(routes)
+    application = classy.Application()
+    application.routes = routes
+    logger = logging.getLogger('classy.benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    application.configuration = {'logger': logger}
+    application.route_trie = route_trie
+    cached_application = classy.Application()
+    cached_application.routes = routes
+    cached_application.route_trie = route_trie
+    cached_application.match_cache = routing.MatchCache(len(paths))
+    environs = [make_environ(path) for path in paths]
+    start_response = lambda status, headers: None
+
+    def _call(environ):
+        environ['wsgi.input'].seek(0)
+        application(environ, start_response)
+
+    results = {
+        'match': measure(lambda p: routing.match(route_trie, p, 'get'),
+                         paths),
+        'match_cached': measure(lambda p: cached_application._match(p, 'get'),
+                                paths),
+        'application': measure(_call, environs),
+    }
+    return {'parameters': {'width': width, 'depth': depth,
+                           'requests': requests, 'seed': seed,
+                           'controllers': len(controllers)},
+            'environment': {'python': platform.python_version(),
+                            'platform': platform.platform(),
+                            'commit': _git_commit()},
+            'results': results}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(__file__)
+                                       ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(report):
+    print('{controllers} controllers (width {width}, depth {depth}), '
+          '{requests} paths'.format(**report['parameters']))
+    for name, result in report['results'].items():
+        print('{:<14} {:>11.0f} ops/s  p50 {:>8.2f}us  p99 {:>8.2f}us  '
+              '{:>6.1f} retained blocks/op  {:>8.0f} peak bytes/op'.format(
+                  name, result['ops_per_second'], result['p50_us'],
+                  result['p99_us'], result['retained_blocks_per_op'],
+                  result['peak_bytes_per_op']))
+
+
+def compare(before_filename, after_filename):
+    with open(before_filename) as file:
+        before = json.load(file)
+    with open(after_filename) as file:
+        after = json.load(file)
+    print('{} -> {}'.format(before['environment']['commit'],
+                            after['environment']['commit']))
+    for name, result in after['results'].items():
+        if name not in before['results']:
+            continue
+        previous = before['results'][name]
+        print('{:<14} ops/s {:>+7.1%}  p50 {:>+7.1%}  p99 {:>+7.1%}'.format(
+            name, result['ops_per_second'] / previous['ops_per_second'] - 1,
+            result['p50_us'] / previous['p50_us'] - 1,
+            result['p99_us'] / previous['p99_us'] - 1))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--width', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-controllers', type=int, default=5000)
+    parser.add_argument('--output', default=None,
+                        help='file to save the results to, as JSON')
+    parser.add_argument('--compare', nargs=2, default=None,
+                        metavar=('BEFORE', 'AFTER'),
+                        help='compare two saved results instead of running')
+    arguments = parser.parse_args()
+    if arguments.compare:
+        compare(*arguments.compare)
+    else:
+        report = run(arguments.width, arguments.depth, arguments.requests,
+                     arguments.seed, arguments.max_controllers)
+        print_results(report)
+        if arguments.output:
+            with open(arguments.output, 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
@@ -0,0 +1,104 @@
+""" Benchmark of static file delivery through a real waitress server.
+
+    Serves one large file with a FileController in three ways and reports
+    the throughput seen by a client along with the CPU time the server
+    spent:
+
+    * iterator: the blocking FileIterator (wsgi.file_wrapper is hidden)
+    * mmap: the MemoryMappedFileIterator (wsgi.file_wrapper is hidden)
+    * file_wrapper: the server's wsgi.file_wrapper
+
+    Run with: python testing/benchmark_static.py [size in MiB] [requests]
+"""
+# standard libraries
+import os
+import sys
+import time
+import signal
+import socket
+import tempfile
+import subprocess
+import urllib.request
+# third party libraries
+import waitress
+# first party libraries
+import classy
+from classy import static
+
+
+MODES = ('iterator', 'mmap', 'file_wrapper')
+
+
+def serve(mode, filename, port):
+
+    class Asset(static.FileController):
+        pass
+
+    Asset.filename = filename
+    if mode == 'mmap':
+        Asset.mmap_threshold = 0
+    elif mode == 'iterator':
+        Asset.mmap_threshold = None
+    application = classy.Application()
+    application.add_route('/', Asset)
+    application.configure()
+    classy.logger.disabled = True
+
+    def hide_file_wrapper(environ, start_response):
+        if mode != 'file_wrapper':
+            environ.pop('wsgi.file_wrapper', None)
+        return application(environ, start_response)
+
+    def report_cpu_time(signal_number, frame):
+        print(time.process_time(), flush=True)
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, report_cpu_time)
+    server = waitress.create_server(hide_file_wrapper, host='127.0.0.1',
+                                    port=port, threads=4)
+    print('ready', flush=True)
+    server.run()
+
+
+def unused_port():
+    with socket.socket() as unbound_socket:
+        unbound_socket.bind(('127.0.0.1', 0))
+        return unbound_socket.getsockname()[1]
+
+
+def benchmark(mode, filename, size, requests):
+    port = unused_port()
+    server = subprocess.Popen([sys.executable, __file__, '--serve', mode,
+                               filename, str(port)],
+                              stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        server.stdout.readline()
+        start = time.perf_counter()
+        for _ in range(requests):
+            url = 'http://127.0.0.1:{}/'.format(port)
+            with urllib.request.urlopen(url) as response:
+                while response.read(1048576):
+                    pass
+        elapsed = time.perf_counter() - start
+    finally:
+        server.send_signal(signal.SIGTERM)
+        cpu_time = float(server.stdout.readline())
+        server.wait()
+    megabytes = size * requests / 1048576
+    print('{:<14} {:>9.1f} MB/s {:>9.3f} s server CPU'.format(
+        mode, megabytes / elapsed, cpu_time))
+
+
+if __name__ == '__main__':
+
+    if sys.argv[1:2] == ['--serve']:
+        mode, filename, port = sys.argv[2:5]
+        serve(mode, filename, int(port))
+    else:
+        size = int(sys.argv[1]) * 1048576 if len(sys.argv) > 1 else 64 << 20
+        requests = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        with tempfile.NamedTemporaryFile(suffix='.bin') as temporary_file:
+            temporary_file.write(os.urandom(size))
+            temporary_file.flush()
+            for mode in MODES:
+                benchmark(mode, temporary_file.name, size, requests)
@@ -0,0 +1,91 @@
+""" Microbenchmark of utilities.Url as it is used by routing.match.
+
+    Compares the current Url (an offset view over a tuple of segments shared
+    by every slice) with the previous list-of-UrlSegment implementation,
+    reproduced below as LegacyUrl, on the operations matching performs:
+    parsing the path, then slicing off the leading segment at every depth
+    and reading the raw and normalized form of each remaining segment.
+    Also reports the time and peak traced memory of a full routing.match.
+
+    Run with: python testing/benchmark_url.py
+"""
+# standard libraries
+import timeit
+import tracemalloc
+# third party libraries
+pass
+# first party libraries
+import classy
+from classy import (routing, utilities)
+
+
+class LegacyUrl:
+
+    def __init__(self, url):
+        self.url_segments = [utilities.UrlSegment(u)
+                             for u in url.split('/') if u != '']
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return LegacyUrl('/'.join(map(str, self.url_segments[item])))
+        else:
+            return self.url_segments[item]
+
+    def __len__(self):
+        return len(self.url_segments)
+
+
+def traverse_legacy(path):
+    url = LegacyUrl(path)
+    while len(url) > 0:
+        [(str(u), u.normalized) for u in url.url_segments]
+        url = url[1:]
+
+
+def traverse(path):
+    url = utilities.Url(path)
+    while len(url) > 0:
+        url.segments, url.normalized_segments
+        url = url[1:]
+
+
+def peak_bytes(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def report(name, function, *args, number=20000):
+    seconds = timeit.timeit(lambda: function(*args), number=number)
+    print('{:<28} {:>9.2f} us/call {:>9} peak bytes/call'.format(
+        name, 1e6 * seconds / number, peak_bytes(function, *args)))
+
+
+class Settings(classy.Controller):
+
+    def get(self, setting=None, person_id=None):
+        pass
+
+
+class People(classy.Controller):
+
+    settings = Settings
+
+    def get(self, person_id, *args):
+        pass
+
+
+if __name__ == '__main__':
+
+    path = '/api/v1/people/brian-petersen/settings/display-name'
+    report('legacy url traversal', traverse_legacy, path)
+    report('url traversal', traverse, path)
+    route_trie = routing.compile_routes({'/api/v1/people': People})
+    report('routing.match', routing.match, route_trie, path, 'GET')
@@ -0,0 +1,110 @@
+""" What the tests share: a Client sending requests straight to an
+    application, file helpers and a doctest runner whose failures fail the
+    test that runs it.
+"""
+# standard libraries
+import os
+import sys
+import asyncio
+import doctest
+import logging
+# third party libraries
+import webob
+# first party libraries
+import classy
+
+# the applications under test log (errors included) to nowhere
+logger = logging.getLogger('classy.testing')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+class Client:
+    """ Configures an application serving routes (a dict of route to
+        Controller) with configuration, and sends it requests without a
+        server.  Header keyword arguments are spelled with underscores, eg
+        accept_encoding for Accept-Encoding.
+    """
+
+    def __init__(self, routes, **configuration):
+        configuration.setdefault('logger', logger)
+        application = classy.Application()
+        application.routes = {}
+        application.configuration = configuration
+        for route, Controller in routes.items():
+            application.add_route(route, Controller)
+        application.configure()
+        self.application = application
+
+    def blank(self, method, path, body=None, **headers):
+        headers = {name.replace('_', '-').title(): value
+                   for name, value in headers.items()}
+        request = webob.Request.blank(path, method=method, headers=headers,
+                                      remote_addr='127.0.0.1')
+        if body is not None:
+            request.body = body
+        return request
+
+    def request(self, method, path, body=None, **headers):
+        request = self.blank(method, path, body, **headers)
+        return request.get_response(self.application)
+
+    def get(self, path, **headers):
+        return self.request('GET', path, **headers)
+
+    def put(self, path, body, **headers):
+        return self.request('PUT', path, body, **headers)
+
+    def asgi(self, method, path, chunks=(), **headers):
+        """ Sends a request through the application's ASGI interface, with 
+            its body in as many http.request messages as chunks, and 
+            returns the response as a webob.Response.
+        """
+        headers = [(name.replace('_', '-').encode('latin-1'),
+                    str(value).encode('latin-1'))
+                   for name, value in headers.items()]
+        scope = {'type': 'http', 'http_version': '1.1', 'method': method,
+                 'scheme': 'http', 'path': path, 'query_string': b'',
+                 'headers': headers, 'client': ('127.0.0.1', 50000),
+                 'server': ('localhost', 80)}
+        messages = [{'type': 'http.request', 'body': chunk, 
+                     'more_body': True} for chunk in chunks]
+        messages.append({'type': 'http.request', 'body': b'',
+                         'more_body': False})
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application.asgi(scope, receive, send))
+        start, body = sent[0], b''.join(message.get('body', b'')
+                                        for message in sent[1:])
+        return webob.Response(body, status=start['status'], headerlist=[
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in start['headers']])
+
+
+def write_file(directory, name, body):
+    """ Writes body to name (with / as separator) under directory. """
+    with open(os.path.join(directory, *name.split('/')), 'wb') as file:
+        file.write(body)
+
+
+def read_file(directory, name):
+    with open(os.path.join(directory, *name.split('/')), 'rb') as file:
+        return file.read()
+
+
+def run_doctests(*modules):
+    """ Runs the doctests of modules (or of the modules named), returning
+        the number of examples that failed.
+    """
+    failed = 0
+    for module in modules:
+        if isinstance(module, str):
+            module = sys.modules[module]
+        failed += doctest.testmod(module).failed
+    return failed
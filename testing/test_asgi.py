@@ -0,0 +1,116 @@
+""" The ASGI interface (asgi.handle), end to end through an Application.
+
+A request body sent in several messages, without a Content-Length (as for
+a chunked request), is seen whole, with its length:
+
+>>> response = client.asgi('POST', '/echo', [b'hello, ', b'wor', b'ld'])
+>>> response.status, response.body
+('200 OK', b'12 hello, world')
+>>> client.asgi('POST', '/echo', [b'hel', b'lo'], content_length=5).body
+b'5 hello'
+>>> client.asgi('GET', '/echo').body
+b'0 '
+
+Bodies larger than asgi_memory_threshold are spooled to disk, and uploads
+stream from either:
+
+>>> chunks = [bytes([65 + index]) * 10 for index in range(10)]
+>>> client.asgi('PUT', '/files/letters.txt', chunks).status
+'201 Created'
+>>> support.read_file(root, 'letters.txt') == b''.join(chunks)
+True
+>>> client.asgi('PUT', '/files/short.txt', [b'ab', b'c']).status
+'201 Created'
+>>> support.read_file(root, 'short.txt')
+b'abc'
+
+Handlers that return an awaitable, decorated or not, are awaited:
+
+>>> client.asgi('GET', '/slow/ann').body
+b'slow ann'
+>>> response = client.asgi('GET', '/private', authorization=credentials)
+>>> response.status, response.body
+('200 OK', b'private')
+>>> client.asgi('GET', '/private').status
+'401 Unauthorized'
+>>> client.asgi('GET', '/boom').status
+'500 Internal Server Error'
+
+Under WSGI, where they can't be awaited, they fail:
+
+>>> client.get('/private', authorization=credentials).status
+'500 Internal Server Error'
+
+"""
+# standard libraries
+import base64
+import shutil
+import asyncio
+import unittest
+import tempfile
+# third party libraries
+pass
+# first party libraries
+import classy
+from classy import asgi, static, authentication
+import support
+
+root = tempfile.mkdtemp()
+credentials = 'Basic ' + base64.b64encode(b'ann:secret').decode('ascii')
+
+
+class Echo(classy.Controller):
+
+    def get(self):
+        return '{} {}'.format(self.request.content_length,
+                              self.request.text)
+
+    post = get
+
+
+class Slow(classy.Controller):
+
+    async def get(self, name):
+        await asyncio.sleep(0.01)
+        return 'slow ' + name
+
+
+class Private(classy.Controller):
+
+    @authentication.Basic(lambda username, password: password == 'secret',
+                          'private')
+    async def get(self):
+        await asyncio.sleep(0)
+        return 'private'
+
+
+class Boom(classy.Controller):
+
+    async def get(self):
+        raise ValueError('boom')
+
+
+class Files(static.DirectoryController):
+    path = root
+    allow_uploads = True
+
+
+client = support.Client({'/echo': Echo, '/slow': Slow, '/private': Private,
+                         '/boom': Boom, '/files': Files},
+                        asgi_memory_threshold=16, asgi_threads=4)
+
+
+class TestAsgi(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__, asgi), 0)
+
+
+def tearDownModule():
+    executor = client.application.asgi_executor
+    if executor is not None:
+        executor.shutdown()
+    shutil.rmtree(root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# standard libraries
+import os
+import sys
+import unittest
+import subprocess
+# third party libraries
+pass
+# first party libraries
+pass
+
+# importing classy and using Controller and routing should load only these
+# of its modules; the rest (and webob, waitress and asyncio) are imported on
+# first use.  Checked through sys.modules rather than by timing, which
+# varies too much between machines and runs.
+STATEMENT = 'import classy; classy.Controller; classy.routing.match'
+EAGER_MODULES = ('classy', 'classy.controllers', 'classy.exceptions',
+                 'classy.routing', 'classy.utilities')
+DEFERRED_MODULES = ('waitress', 'webob', 'asyncio', 'classy.application',
+                    'classy.static', 'classy.caching', 'classy.authentication',
+                    'classy.metrics', 'classy.profiling', 'classy.log_queue',
+                    'classy.asgi', 'classy.prefork', 'classy.uploads')
+_where = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_modules(statement):
+    """ The names of the modules loaded after running statement in a fresh
+        interpreter.
+    """
+    statement += '; import sys; print(sorted(sys.modules))'
+    completed = subprocess.run([sys.executable, '-c', statement],
+                               capture_output=True, text=True, check=True,
+                               cwd=_where)
+    return set(eval(completed.stdout))
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_eager_imports(self):
+        modules = imported_modules(STATEMENT)
+        classy_modules = set(name for name in modules
+                             if name == 'classy' or name.startswith('classy.'))
+        self.assertEqual(classy_modules, set(EAGER_MODULES))
+
+    def test_deferred_imports(self):
+        modules = imported_modules(STATEMENT)
+        for name in DEFERRED_MODULES:
+            self.assertNotIn(name, modules)
+
+    def test_exceptions_star_import(self):
+        modules = imported_modules('from classy.exceptions import *; '
+                                   'HTTPNotFound, HTTPException, status_map, '
+                                   'ErrorResponses')
+        self.assertIn('webob.exc', modules)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+""" ResponseCache decorating a controller's handler, through an Application
+    (with a clock the tests move by hand).
+
+Responses are cached for ttl seconds, keyed on the URL's arguments:
+
+>>> get('/people/ann').text, get('/people/ann').text, get('/people/bob').text
+('ann 1', 'ann 1', 'bob 2')
+>>> clock.now += 9
+>>> get('/people/ann').text
+'ann 1'
+>>> clock.now += 2
+>>> get('/people/ann').text
+'ann 3'
+
+Within stale_while_revalidate seconds of expiring, the first request
+recomputes the response while concurrent ones are served the stale copy
+at once; the handler runs only once:
+
+>>> get('/slow').text
+'slow 1'
+>>> clock.now += 15
+>>> refreshing = threading.Thread(target=lambda: results.append(
+...     get('/slow').text))
+>>> refreshing.start()
+>>> Slow.entered.wait(5)
+True
+>>> [get('/slow').text for _ in range(3)]
+['slow 1', 'slow 1', 'slow 1']
+>>> Slow.release.set()
+>>> refreshing.join(5)
+>>> results, get('/slow').text, Slow.calls
+(['slow 2'], 'slow 2', 2)
+>>> slow_cache.statistics['stale_hits']
+3
+
+Once the stale window has passed too, the response is recomputed as on a
+miss:
+
+>>> clock.now += 100
+>>> get('/slow').text, Slow.calls
+('slow 3', 3)
+
+Responses other than 200, and any that set a cookie, aren't cached:
+
+>>> [get('/uncached/accepted').status for _ in range(2)], Uncached.calls
+(['202 Accepted', '202 Accepted'], 2)
+>>> [get('/uncached/cookie').text for _ in range(2)], Uncached.calls
+(['cookie 3', 'cookie 4'], 4)
+>>> [get('/uncached/missing').status for _ in range(2)], Uncached.calls
+(['404 Not Found', '404 Not Found'], 6)
+>>> get('/uncached/plain').text, get('/uncached/plain').text
+('plain 7', 'plain 7')
+
+The cache is bounded by max_bytes, evicting the least recently used:
+
+>>> [get('/large/{}'.format(name)).status for name in 'abc']
+['200 OK', '200 OK', '200 OK']
+>>> large_cache.statistics['entries'], large_cache.statistics['evictions']
+(2, 1)
+>>> large_cache.statistics['size'] <= large_cache.max_bytes
+True
+>>> _ = get('/large/c'), get('/large/b')
+>>> Large.calls
+3
+>>> _ = get('/large/a')
+>>> Large.calls
+4
+
+"""
+# standard libraries
+import types
+import unittest
+import threading
+# third party libraries
+pass
+# first party libraries
+import classy
+from classy import caching, exceptions
+from classy.caching import responses
+import support
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+clock = Clock()
+original_time = responses.time
+results = []
+people_cache = caching.ResponseCache(ttl=10)
+slow_cache = caching.ResponseCache(ttl=10, stale_while_revalidate=60)
+uncached_cache = caching.ResponseCache(ttl=60)
+large_cache = caching.ResponseCache(ttl=60, max_bytes=1000)
+
+
+class People(classy.Controller):
+
+    calls = 0
+
+    @people_cache
+    def get(self, name):
+        People.calls += 1
+        return '{} {}'.format(name, People.calls)
+
+
+class Slow(classy.Controller):
+
+    calls = 0
+    entered = threading.Event()
+    release = threading.Event()
+
+    @slow_cache
+    def get(self):
+        Slow.calls += 1
+        if Slow.calls == 2:
+            Slow.entered.set()
+            Slow.release.wait(5)
+        return 'slow {}'.format(Slow.calls)
+
+
+class Uncached(classy.Controller):
+
+    calls = 0
+
+    @uncached_cache
+    def get(self, kind):
+        Uncached.calls += 1
+        if kind == 'accepted':
+            self.response.status = 202
+        elif kind == 'cookie':
+            self.response.set_cookie('session', 'abc')
+        elif kind == 'missing':
+            raise exceptions.HTTPNotFound
+        return '{} {}'.format(kind, Uncached.calls)
+
+
+class Large(classy.Controller):
+
+    calls = 0
+
+    @large_cache
+    def get(self, name):
+        Large.calls += 1
+        return name * 400
+
+
+client = support.Client({'/people': People, '/slow': Slow,
+                         '/uncached': Uncached, '/large': Large})
+get = client.get
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__, responses), 0)
+
+
+def setUpModule():
+    # the cache reads the time through its module's time
+    responses.time = types.SimpleNamespace(monotonic=clock.monotonic)
+
+
+def tearDownModule():
+    responses.time = original_time
+
+if __name__ == '__main__':
+    unittest.main()
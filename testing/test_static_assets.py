@@ -0,0 +1,95 @@
+""" A DirectoryController with an asset cache, through an Application.
+
+Small files are kept in memory once they've been served:
+
+>>> write('site.css', b'body { color: black; }')
+>>> response = get('/files/site.css')
+>>> response.status, response.content_type, response.body
+('200 OK', 'text/css', b'body { color: black; }')
+>>> asset_cache.statistics['size'], asset_cache.statistics['files']
+(22, 1)
+
+and then served without touching the file system until stat_interval has
+passed, with the same validators:
+
+>>> os.rename(os.path.join(root, 'site.css'),
+...           os.path.join(root, 'site.css.moved'))
+>>> cached_response = get('/files/site.css')
+>>> cached_response.status, cached_response.body
+('200 OK', b'body { color: black; }')
+>>> cached_response.etag == response.etag
+True
+>>> os.rename(os.path.join(root, 'site.css.moved'),
+...           os.path.join(root, 'site.css'))
+
+Conditional and range requests are answered from the cache too:
+
+>>> get('/files/site.css', if_none_match=response.headers['ETag']).status
+'304 Not Modified'
+>>> ranged_response = get('/files/site.css', range='bytes=0-3')
+>>> ranged_response.status, ranged_response.body
+('206 Partial Content', b'body')
+
+A file that changes is re-read once it's re-validated:
+
+>>> asset_cache.stat_interval = 0
+>>> write('site.css', b'body { color: white; }', mtime=1)
+>>> get('/files/site.css').body
+b'body { color: white; }'
+
+Files larger than max_file_size are served from disk and not cached:
+
+>>> write('large.txt', b'x' * 2048)
+>>> len(get('/files/large.txt').body)
+2048
+>>> asset_cache.statistics['files']
+1
+
+"""
+# standard libraries
+import os
+import time
+import shutil
+import unittest
+import tempfile
+# third party libraries
+pass
+# first party libraries
+from classy import static, caching
+from classy.caching import assets
+import support
+
+root = tempfile.mkdtemp()
+asset_cache = caching.AssetCache(max_bytes=4096, max_file_size=1024,
+                                 stat_interval=60)
+
+
+class Files(static.DirectoryController):
+    path = root
+
+
+Files.asset_cache = asset_cache
+client = support.Client({'/files': Files})
+get = client.get
+
+
+def write(name, body, mtime=0):
+    """ Writes a file under root, moving its modification time mtime
+        seconds past now so a rewrite is noticed within the same second.
+    """
+    support.write_file(root, name, body)
+    now = time.time() + mtime
+    os.utime(os.path.join(root, name), (now, now))
+
+
+class TestStaticAssets(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__, assets), 0)
+
+
+def tearDownModule():
+    shutil.rmtree(root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+""" Fingerprinted names from a DirectoryController's manifest, through an
+    Application.
+
+The manifest is prepared when the application is configured, and gives
+the URL to link to for a file:
+
+>>> url = manifest.url('js/app.js')
+>>> url
+'/static/js/app.e63170ac.js'
+
+A fingerprinted name is served with the file's contents and immutable
+caching, while its logical name is served with the usual max-age:
+
+>>> response = get(url)
+>>> response.status, response.body
+('200 OK', b'alert(1);')
+>>> response.headers['Cache-Control']
+'public, max-age=31536000, immutable'
+>>> response = get('/static/js/app.js')
+>>> response.body, response.headers['Cache-Control']
+(b'alert(1);', 'max-age=60')
+
+Once the file changes, its old fingerprint is no longer served (so stale
+content is never cached as immutable) and the manifest gives a new one:
+
+>>> write('js/app.js', b'alert(2);')
+>>> get(url).status
+'404 Not Found'
+>>> new_url = manifest.url('js/app.js')
+>>> new_url == url, get(new_url).body
+(False, b'alert(2);')
+
+The manifest itself, saved under the served directory, and other hidden
+files can't be fetched or overwritten:
+
+>>> os.path.exists(os.path.join(root, '.manifest.json'))
+True
+>>> get('/static/.manifest.json').status
+'404 Not Found'
+>>> get('/static/js/%2Emanifest.json').status
+'404 Not Found'
+>>> put('/static/.manifest.json', b'{}').status
+'403 Forbidden'
+
+"""
+# standard libraries
+import os
+import shutil
+import unittest
+import tempfile
+import functools
+# third party libraries
+pass
+# first party libraries
+from classy import static
+from classy.static import manifest as manifests
+import support
+
+root = tempfile.mkdtemp()
+os.mkdir(os.path.join(root, 'js'))
+write = functools.partial(support.write_file, root)
+write('js/app.js', b'alert(1);')
+write('js/.manifest.json', b'{}')
+manifest = manifests.Manifest(root, url_prefix='/static/', stat_interval=0)
+
+
+class Static(static.DirectoryController):
+    path = root
+    manifest = manifest
+    cache_max_age = 60
+    allow_uploads = True
+
+
+client = support.Client({'/static': Static})
+get = client.get
+put = client.put
+
+
+class TestStaticFingerprints(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__, manifests), 0)
+
+
+def tearDownModule():
+    shutil.rmtree(root)
+
+if __name__ == '__main__':
+    unittest.main()
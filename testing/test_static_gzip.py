@@ -0,0 +1,92 @@
+""" gzip content coding for a DirectoryController, through an Application.
+
+Text files are compressed for clients that accept gzip, with a distinct
+entity tag, and every response for them varies on Accept-Encoding:
+
+>>> write('app.js', b'console.log("hello");\\n' * 100)
+>>> response = get('/files/app.js', accept_encoding='gzip, deflate')
+>>> response.status, response.content_encoding, response.vary
+('200 OK', 'gzip', ('Accept-Encoding',))
+>>> gzip.decompress(response.body) == read('app.js')
+True
+>>> response.headers['ETag'].endswith('-gzip"')
+True
+>>> identity_response = get('/files/app.js')
+>>> identity_response.content_encoding, identity_response.vary
+(None, ('Accept-Encoding',))
+>>> identity_response.body == read('app.js')
+True
+>>> identity_response.headers['ETag'] == response.headers['ETag']
+False
+>>> get('/files/app.js', accept_encoding='gzip;q=0, br').content_encoding
+>>> get('/files/app.js', accept_encoding='*').content_encoding
+'gzip'
+
+Revalidating the compressed representation gives 304:
+
+>>> get('/files/app.js', accept_encoding='gzip',
+...     if_none_match=response.headers['ETag']).status
+'304 Not Modified'
+
+A precompressed sibling is sent as it is:
+
+>>> write('data.json', b'[]' * 1000)
+>>> write('data.json.gz', gzip_compress(b'[]' * 1000, 9))
+>>> response = get('/files/data.json', accept_encoding='gzip')
+>>> response.content_encoding, response.body == read('data.json.gz')
+('gzip', True)
+
+Files too small to be worth compressing and content types that aren't
+compressible are sent as they are; only the former vary:
+
+>>> write('tiny.txt', b'hi')
+>>> response = get('/files/tiny.txt', accept_encoding='gzip')
+>>> response.content_encoding, response.vary, response.body
+(None, ('Accept-Encoding',), b'hi')
+>>> write('image.png', b'\\x89PNG' * 1000)
+>>> response = get('/files/image.png', accept_encoding='gzip')
+>>> response.content_encoding, response.vary
+(None, None)
+
+"""
+# standard libraries
+import gzip
+import shutil
+import unittest
+import tempfile
+import functools
+# third party libraries
+pass
+# first party libraries
+from classy import static, caching
+from classy.static import compression
+from classy.static.compression import gzip_compress
+import support
+
+root = tempfile.mkdtemp()
+
+
+class Files(static.DirectoryController):
+    path = root
+    gzip = True
+    gzip_min_size = 64
+    gzip_cache = caching.AssetCache(max_bytes=65536)
+
+
+client = support.Client({'/files': Files})
+get = client.get
+write = functools.partial(support.write_file, root)
+read = functools.partial(support.read_file, root)
+
+
+class TestStaticGzip(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__, compression), 0)
+
+
+def tearDownModule():
+    shutil.rmtree(root)
+
+if __name__ == '__main__':
+    unittest.main()
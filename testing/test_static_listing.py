@@ -0,0 +1,110 @@
+""" Directory listings from a DirectoryController, through an Application.
+
+Directories are refused unless directory_listing is set:
+
+>>> get('/private/').status
+'403 Forbidden'
+
+Listings are HTML by default, or JSON when asked for, with directories
+first and hidden files left out:
+
+>>> response = get('/files/')
+>>> response.status, response.content_type, response.vary
+('200 OK', 'text/html', ('Accept',))
+>>> 'href="/files/my%20notes.txt"' in response.text
+True
+>>> '.secret' in response.text
+False
+>>> names(get('/files/?format=json'))
+['docs', 'a.txt', 'b.txt', 'c.txt', 'my notes.txt']
+>>> names(get('/files/', accept='application/json'))
+['docs', 'a.txt', 'b.txt', 'c.txt', 'my notes.txt']
+
+Links in a listing can be followed, including names that need quoting:
+
+>>> get('/files/my%20notes.txt').body
+b'spaces'
+>>> names(get('/files/docs?format=json'))
+['readme.txt']
+
+Listings are sorted and paginated by query parameters:
+
+>>> names(get('/files/?format=json&sort=size&order=desc'))
+['docs', 'c.txt', 'my notes.txt', 'b.txt', 'a.txt']
+>>> listing = json.loads(get('/files/?format=json&per_page=2&page=2').text)
+>>> listing['page'], listing['pages'], listing['total']
+(2, 3, 5)
+>>> [entry['name'] for entry in listing['entries']]
+['b.txt', 'c.txt']
+>>> get('/files/?format=json&per_page=2&page=4').status
+'404 Not Found'
+>>> get('/files/?sort=colour').status
+'400 Bad Request'
+
+Pages are cached until the directory changes:
+
+>>> listing_cache = Files.listing_cache
+>>> hits, scans = listing_cache.hits, listing_cache.scans
+>>> _ = get('/files/?format=json&per_page=2&page=2')
+>>> listing_cache.hits - hits, listing_cache.scans - scans
+(1, 0)
+>>> write('d.txt', b'new')
+>>> listing = json.loads(get('/files/?format=json&per_page=2&page=2').text)
+>>> listing['total'], listing_cache.scans - scans
+(6, 1)
+
+"""
+# standard libraries
+import os
+import json
+import shutil
+import unittest
+import tempfile
+import functools
+# third party libraries
+pass
+# first party libraries
+from classy import static
+from classy.static import listing
+import support
+
+root = tempfile.mkdtemp()
+
+
+class Files(static.DirectoryController):
+    path = root
+    directory_listing = True
+    listing_cache = listing.ListingCache(racy_interval=0)
+
+
+class Private(static.DirectoryController):
+    path = root
+
+
+client = support.Client({'/files': Files, '/private': Private})
+get = client.get
+write = functools.partial(support.write_file, root)
+
+
+def names(response):
+    return [entry['name'] for entry in json.loads(response.text)['entries']]
+
+
+os.mkdir(os.path.join(root, 'docs'))
+for name, body in (('a.txt', b'a'), ('b.txt', b'bbb'), ('c.txt', b'cccccccc'),
+                   ('my notes.txt', b'spaces'), ('.secret', b'hidden'),
+                   ('docs/readme.txt', b'read me')):
+    write(name, body)
+
+
+class TestStaticListing(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__, listing), 0)
+
+
+def tearDownModule():
+    shutil.rmtree(root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+""" Uploads (PUT) to a DirectoryController with allow_uploads, through an
+    Application.
+
+>>> put('/files/notes.txt', b'first draft').status
+'201 Created'
+>>> get('/files/notes.txt').body
+b'first draft'
+>>> put('/files/notes.txt', b'second draft').status
+'204 No Content'
+>>> get('/files/notes.txt').body
+b'second draft'
+
+A body without a Content-Length is read to its end only if the server
+marks the input as terminated; otherwise the upload is refused, leaving
+the file as it was, rather than taken to be empty:
+
+>>> put_chunked('/files/notes.txt', b'third draft').status
+'411 Length Required'
+>>> get('/files/notes.txt').body
+b'second draft'
+>>> put_chunked('/files/notes.txt', b'third draft', terminated=True).status
+'204 No Content'
+>>> get('/files/notes.txt').body
+b'third draft'
+
+Only paths under the directory can be written, including ones that merely
+share its name as a prefix:
+
+>>> os.mkdir(root + '-evil')
+>>> put('/files/../files-evil/pwn.txt', b'pwned').status
+'403 Forbidden'
+>>> put('/files/%2E%2E/files-evil/pwn.txt', b'pwned').status
+'403 Forbidden'
+>>> os.listdir(root + '-evil')
+[]
+
+Bodies over max_upload_size are refused, and so are uploads into missing
+directories or over a directory:
+
+>>> put('/files/big.bin', b'x' * 2048).status
+'413 Request Entity Too Large'
+>>> os.path.exists(os.path.join(root, 'big.bin'))
+False
+>>> put('/files/missing/notes.txt', b'lost').status
+'409 Conflict'
+>>> os.mkdir(os.path.join(root, 'drafts'))
+>>> put('/files/drafts', b'flattened').status
+'409 Conflict'
+
+A new file gets the usual permissions for the umask, rather than those of
+a private temporary file, and a replaced file keeps its own:
+
+>>> mode('notes.txt') == 0o666 & ~umask
+True
+>>> os.chmod(os.path.join(root, 'notes.txt'), 0o640)
+>>> put('/files/notes.txt', b'fourth draft').status
+'204 No Content'
+>>> oct(mode('notes.txt'))
+'0o640'
+
+No temporary files are left behind:
+
+>>> sorted(os.listdir(root))
+['drafts', 'notes.txt']
+
+"""
+# standard libraries
+import os
+import shutil
+import unittest
+import tempfile
+# third party libraries
+pass
+# first party libraries
+from classy import static
+import support
+
+parent = tempfile.mkdtemp()
+root = os.path.join(parent, 'files')
+os.mkdir(root)
+umask = os.umask(0)
+os.umask(umask)
+
+
+class Files(static.DirectoryController):
+    path = root
+    allow_uploads = True
+    max_upload_size = 1024
+
+
+client = support.Client({'/files': Files})
+get = client.get
+put = client.put
+
+
+def mode(name):
+    return os.stat(os.path.join(root, name)).st_mode & 0o7777
+
+
+def put_chunked(path, body, terminated=False):
+    """ PUTs body as a server would pass on a chunked request: without a
+        Content-Length.
+    """
+    request = client.blank('PUT', path, body, transfer_encoding='chunked')
+    del request.environ['CONTENT_LENGTH']
+    if terminated:
+        request.environ['wsgi.input_terminated'] = True
+    return request.get_response(client.application)
+
+
+class TestUploads(unittest.TestCase):
+
+    def test_doctests(self):
+        self.assertEqual(support.run_doctests(__name__), 0)
+
+
+def tearDownModule():
+    shutil.rmtree(parent)
+
+if __name__ == '__main__':
+    unittest.main()